@@ -0,0 +1,136 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from team_tasks_realtime.conditional import aget_versions, bump_versions, get_versions
+
+
+class TokenCache:
+    """
+    کش محلی (داخل پروسس) token -> (user, token, version) با سقف اندازه (LRU) و TTL.
+    بین احراز هویت REST و WebSocket مشترک است. حذف یا چرخش توکن و تغییر کاربر
+    از طریق signals.py آن را در همین پروسس باطل می‌کند و نسخه‌ی احراز هویت توکن را در
+    کش مشترک (Redis) عوض می‌کند؛ load_token هر hit را با آن نسخه مقایسه می‌کند تا
+    باطل شدن در پروسس‌های دیگر هم فوراً اثر کند.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (_, (user, _, _)) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000),
+    ttl=getattr(settings, 'TOKEN_CACHE_TTL', 300),
+)
+
+
+def token_auth_version_key(key):
+    return f"auth:token:{key}:version"
+
+
+def bump_token_auth_versions(keys):
+    """ورودی token_cache این توکن‌ها را در همه‌ی پروسس‌ها (پس از commit) باطل می‌کند"""
+    bump_versions([token_auth_version_key(key) for key in keys])
+
+
+def _cached_value(cached, version):
+    # هر درخواست کپی خودش را از user می‌گیرد؛ تغییر روی request.user به نمونه‌ی مشترک کش نمی‌رسد
+    user, token, cached_version = cached
+    if cached_version != version:
+        return None
+    return (copy.copy(user), token)
+
+
+def load_token(key):
+    """(user, token) را از کش یا با یک کوئری join می‌خواند؛ توکن نامعتبر None برمی‌گرداند"""
+    # نسخه قبل از دیتابیس خوانده می‌شود: اگر باطل شدن بین این دو commit شود، نسخه‌ی ذخیره‌شده
+    # کنار ردیف قدیمی از قبل منسوخ است و hit بعدی دوباره از دیتابیس می‌خواند
+    version = get_versions([token_auth_version_key(key)])[0]
+    cached = token_cache.get(key)
+    if cached is not None:
+        value = _cached_value(cached, version)
+        if value is not None:
+            return value
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+    except Token.DoesNotExist:
+        # کلید نامعتبر نباید نسخه‌ای در کش مشترک باقی بگذارد
+        cache.delete(token_auth_version_key(key))
+        return None
+    token_cache.set(key, (token.user, token, version))
+    return (copy.copy(token.user), token)
+
+
+async def aload_token(key):
+    """نسخه‌ی async تابع load_token با ORM async"""
+    version = (await aget_versions([token_auth_version_key(key)]))[0]
+    cached = token_cache.get(key)
+    if cached is not None:
+        value = _cached_value(cached, version)
+        if value is not None:
+            return value
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        await cache.adelete(token_auth_version_key(key))
+        return None
+    token_cache.set(key, (token.user, token, version))
+    return (copy.copy(token.user), token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication با کش مشترک token_cache"""
+
+    def authenticate_credentials(self, key):
+        value = load_token(key)
+        if value is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user, token = value
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (user, token)
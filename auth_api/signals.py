@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import bump_token_auth_versions, token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    # حذف یا چرخش توکن (کلید قبلی هم ممکن است در کش باشد)
+    token_cache.invalidate(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+    bump_token_auth_versions([instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # غیرفعال شدن، تغییر username یا حذف کاربر
+    token_cache.invalidate_user(instance.pk)
+    # نسخه‌ها به کلید توکن بسته‌اند؛ توکن‌های حذف‌شده با حذف کاربر را token_changed باطل کرده است
+    bump_token_auth_versions(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
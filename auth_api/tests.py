@@ -1,3 +1,79 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+
+from team_tasks_realtime.testing import LOCAL_SETTINGS
+from .authentication import (
+    CachedTokenAuthentication, aload_token, load_token, token_auth_version_key, token_cache,
+)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_hit_skips_database_and_returns_a_copy(self):
+        user, _ = load_token(self.token.key)
+        user.username = 'changed'
+        with self.assertNumQueries(0):
+            cached_user, token = load_token(self.token.key)
+        self.assertEqual(cached_user.username, 'arash')
+        self.assertIsNot(cached_user, user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_revocation_in_another_process_is_seen_on_next_hit(self):
+        load_token(self.token.key)
+        # پروسس دیگری کاربر را غیرفعال کرده و فقط نسخه‌ی کش مشترک را عوض کرده است
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.delete(token_auth_version_key(self.token.key))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+    def test_deleted_token_is_rejected_after_commit(self):
+        load_token(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertIsNone(load_token(self.token.key))
+
+    def test_revocation_during_miss_is_not_cached_as_valid(self):
+        real_select_related = Token.objects.select_related
+
+        def select_related(*fields):
+            # ردیف خوانده شده و بعد از آن باطل شدن در پروسس دیگری commit می‌شود
+            token = real_select_related(*fields).get(key=self.token.key)
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            cache.delete(token_auth_version_key(self.token.key))
+            return mock.Mock(get=mock.Mock(return_value=token))
+
+        with mock.patch.object(Token.objects, 'select_related', side_effect=select_related):
+            user, _ = load_token(self.token.key)
+        self.assertTrue(user.is_active)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            CachedTokenAuthentication().authenticate_credentials(self.token.key)
+
+    def test_user_change_invalidates_other_processes(self):
+        load_token(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertIsNone(cache.get(token_auth_version_key(self.token.key)))
+        user, _ = load_token(self.token.key)
+        self.assertFalse(user.is_active)
+
+    def test_unknown_key_leaves_no_version(self):
+        self.assertIsNone(load_token('missing'))
+        self.assertIsNone(cache.get(token_auth_version_key('missing')))
+
+    async def test_async_load_uses_the_same_cache(self):
+        user, token = await aload_token(self.token.key)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNotNone(token_cache.get(self.token.key))
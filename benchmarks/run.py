@@ -0,0 +1,309 @@
+"""
+بنچمارک قابل تکرار مسیرهای REST و WebSocket.
+
+اجرا:
+    python -m benchmarks.run --teams 10 --members 20 --tasks 5000 --output bench.json
+
+خروجی یک JSON است (throughput، صدک‌های latency، تعداد کوئری SQL در هر درخواست
+و latency تحویل نوتیفیکیشن) تا نتایج commit های مختلف با هم مقایسه شوند.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.db import database_sync_to_async  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from notifications.middleware import TokenAuthMiddleware  # noqa: E402
+from notifications.routing import get_websocket_urlpatterns  # noqa: E402
+from notifications.utils import send_bulk_realtime_notifications  # noqa: E402
+from tasks.models import PRIORITY_NAMES, Task  # noqa: E402
+from teams.models import Team  # noqa: E402
+
+
+SCENARIOS = ('create', 'list', 'assign', 'mention')
+
+
+def reset_database():
+    connection.close()
+    path = settings.DATABASES['default']['NAME']
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(f"{path}{suffix}"):
+            os.remove(f"{path}{suffix}")
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def seed(teams, members, tasks, rng):
+    """داده‌ی اولیه با bulk insert؛ هر تیم اعضای جداگانه دارد"""
+    users = User.objects.bulk_create([
+        User(username=f"bench_user_{i}", password='!')
+        for i in range(teams * members)
+    ])
+    tokens = Token.objects.bulk_create([
+        Token(key=Token.generate_key(), user=user) for user in users
+    ])
+    team_objs = Team.objects.bulk_create([Team(name=f"bench_team_{i}") for i in range(teams)])
+
+    Membership = Team.members.through
+    team_members = {}
+    rows = []
+    for index, team in enumerate(team_objs):
+        member_ids = [user.id for user in users[index * members:(index + 1) * members]]
+        team_members[team.id] = member_ids
+        rows.extend(Membership(team_id=team.id, user_id=user_id) for user_id in member_ids)
+    Membership.objects.bulk_create(rows)
+
+    now = timezone.now()
+    per_team = max(tasks // teams, 1)
+    task_objs = []
+    for team in team_objs:
+        member_ids = team_members[team.id]
+        for i in range(per_team):
+            task_objs.append(Task(
+                title=f"bench task {team.id}-{i}",
+                description="seeded",
+                due_date=now + timedelta(days=rng.randint(1, 60)),
+                priority=rng.choice(list(PRIORITY_NAMES)),
+                team=team,
+                creator_id=rng.choice(member_ids),
+                assignee_id=rng.choice(member_ids),
+            ))
+    Task.objects.bulk_create(task_objs, batch_size=1000)
+
+    team_tasks = {}
+    for task_id, team_id in Task.objects.values_list('id', 'team_id'):
+        team_tasks.setdefault(team_id, []).append(task_id)
+
+    return {
+        'tokens': {token.user_id: token.key for token in tokens},
+        'usernames': {user.id: user.username for user in users},
+        'team_members': team_members,
+        'team_tasks': team_tasks,
+    }
+
+
+def build_request(scenario, ctx, rng):
+    team_id = rng.choice(list(ctx['team_members']))
+    member_ids = ctx['team_members'][team_id]
+    user_id = rng.choice(member_ids)
+    mentions = ' '.join(
+        f"@{ctx['usernames'][uid]}" for uid in rng.sample(member_ids, min(3, len(member_ids)))
+    )
+
+    if scenario == 'create':
+        return user_id, 'post', '/api/tasks/create/', {
+            'title': 'bench created task',
+            'description': f"please check {mentions}",
+            'due_date': (timezone.now() + timedelta(days=7)).isoformat(),
+            'priority': 'medium',
+            'assignee': rng.choice(member_ids),
+            'team': team_id,
+        }
+    if scenario == 'list':
+        return user_id, 'get', '/api/tasks/', None
+    task_id = rng.choice(ctx['team_tasks'][team_id])
+    if scenario == 'assign':
+        return user_id, 'post', f'/api/tasks/{task_id}/assign/', {'assignee_id': rng.choice(member_ids)}
+    return user_id, 'post', f'/api/tasks/{task_id}/mention/', {'description': f"ping {mentions}"}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies):
+    return {
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+        'mean_ms': _ms(sum(latencies) / len(latencies)) if latencies else None,
+        'max_ms': _ms(max(latencies)) if latencies else None,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_scenario(scenario, ctx, requests, concurrency, seed_value):
+    local = threading.local()
+
+    def one(index):
+        if not hasattr(local, 'client'):
+            local.client = APIClient()
+        rng = random.Random(f"{seed_value}-{scenario}-{index}")
+        user_id, method, url, data = build_request(scenario, ctx, rng)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(local.client, method)(
+                url, data, format='json', HTTP_AUTHORIZATION=f"Token {ctx['tokens'][user_id]}"
+            )
+            elapsed = time.perf_counter() - start
+        return elapsed, len(queries), response.status_code
+
+    def close_connection(_):
+        connection.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - started
+        list(pool.map(close_connection, range(concurrency)))
+
+    latencies = [elapsed for elapsed, _, _ in results]
+    query_counts = [count for _, count, _ in results]
+    errors = [code for _, _, code in results if code >= 400]
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'error_statuses': sorted(set(errors)),
+        'throughput_rps': round(requests / wall, 2) if wall else None,
+        'latency': summarize_latencies(latencies),
+        'queries_per_request': {
+            'mean': round(sum(query_counts) / len(query_counts), 2),
+            'max': max(query_counts),
+        },
+    }
+
+
+async def run_websockets(ctx, sockets, messages):
+    """
+    اتصال همزمان تعداد زیادی NotificationConsumer و اندازه‌گیری latency
+    از لحظه‌ی dispatch تا رسیدن frame به هر کلاینت.
+    """
+    application = TokenAuthMiddleware(URLRouter(get_websocket_urlpatterns()))
+    user_ids = list(ctx['tokens'])
+    targets = [user_ids[i % len(user_ids)] for i in range(sockets)]
+
+    async def open_socket(user_id):
+        communicator = WebsocketCommunicator(
+            application, f"/ws/notifications/?token={ctx['tokens'][user_id]}"
+        )
+        start = time.perf_counter()
+        connected, _ = await communicator.connect(timeout=30)
+        await communicator.receive_json_from(timeout=30)  # welcome
+        return communicator, connected, time.perf_counter() - start
+
+    opened = await asyncio.gather(*(open_socket(user_id) for user_id in targets))
+    communicators = [(user_id, comm) for user_id, (comm, ok, _) in zip(targets, opened) if ok]
+    connect_latencies = [elapsed for _, ok, elapsed in opened if ok]
+
+    recipients = sorted({user_id for user_id, _ in communicators})
+    dispatch = database_sync_to_async(send_bulk_realtime_notifications)
+    delivery_latencies = []
+    dispatch_latencies = []
+    started = time.perf_counter()
+    for _ in range(messages):
+        sent_at = time.perf_counter()
+        await dispatch([(user_id, 'mention', 'bench', 'bench', None) for user_id in recipients])
+        dispatch_latencies.append(time.perf_counter() - sent_at)
+
+        async def receive(comm):
+            await comm.receive_json_from(timeout=30)
+            return time.perf_counter() - sent_at
+
+        delivery_latencies.extend(await asyncio.gather(*(receive(comm) for _, comm in communicators)))
+    wall = time.perf_counter() - started
+
+    await asyncio.gather(*(comm.disconnect() for _, comm in communicators))
+    return {
+        'sockets': len(communicators),
+        'failed_connects': sockets - len(communicators),
+        'connect_latency': summarize_latencies(connect_latencies),
+        'messages_per_socket': messages,
+        'deliveries': len(delivery_latencies),
+        'deliveries_per_second': round(len(delivery_latencies) / wall, 2) if wall else None,
+        'dispatch_latency': summarize_latencies(dispatch_latencies),
+        'delivery_latency': summarize_latencies(delivery_latencies),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Team Tasks Realtime benchmark")
+    parser.add_argument('--teams', type=int, default=10)
+    parser.add_argument('--members', type=int, default=20, help="members per team")
+    parser.add_argument('--tasks', type=int, default=5000, help="total seeded tasks")
+    parser.add_argument('--requests', type=int, default=200, help="requests per scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--sockets', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=20, help="notifications per socket")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+
+    reset_database()
+    ctx = seed(args.teams, args.members, args.tasks, rng)
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'params': vars(args),
+        },
+        'scenarios': {},
+    }
+    for scenario in [name for name in args.scenarios.split(',') if name]:
+        if scenario not in SCENARIOS:
+            raise SystemExit(f"unknown scenario: {scenario}")
+        report['scenarios'][scenario] = run_scenario(
+            scenario, ctx, args.requests, args.concurrency, args.seed
+        )
+    if args.sockets:
+        report['websocket'] = asyncio.run(run_websockets(ctx, args.sockets, args.messages))
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
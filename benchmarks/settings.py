@@ -0,0 +1,44 @@
+"""
+تنظیمات بنچمارک: همه چیز محلی اجرا می‌شود (SQLite + channel layer داخل حافظه)
+و به Redis، RabbitMQ یا Celery worker نیازی نیست.
+"""
+import os
+import tempfile
+
+from team_tasks_realtime.settings import *  # noqa: F401,F403
+
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DB', os.path.join(tempfile.gettempdir(), 'team_tasks_bench.sqlite3')),
+        'OPTIONS': {
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+    }
+}
+
+# مایگریشن‌های اپ‌های پروژه در مخزن نیستند؛ جدول‌ها مستقیم از مدل‌ها ساخته می‌شوند
+MIGRATION_MODULES = {app: None for app in ('teams', 'tasks', 'notifications', 'auth_api')}
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_BROKER_URL = 'memory://'
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,94 @@
+"""
+تجمیع ارسال زنده‌ی نوتیفیکیشن‌های هم‌نوع یک کاربر در یک پنجره‌ی زمانی کوتاه.
+نوتیفیکیشن‌های انواع NOTIFICATION_COALESCE_TYPES مثل بقیه فوراً در دیتابیس ذخیره می‌شوند
+(صندوق پیام، شمارنده‌ی خوانده‌نشده‌ها و بازپخش کامل می‌مانند) ولی held_until آن‌ها تا پایان
+پنجره‌ی جاری (NOTIFICATION_COALESCE_WINDOW ثانیه) پر می‌شود و dispatcher outbox تا آن زمان
+ارسالشان نمی‌کند. بعد از پایان پنجره ردیف‌های هر (کاربر، نوع) یک پیام WebSocket تجمیعی
+مثل «۵ وظیفه به شما واگذار شد» می‌شوند. با مقدار پیش‌فرض (لیست خالی) غیرفعال است.
+
+چون وضعیت پنجره فقط در دیتابیس است، با پاک شدن کش یا خطای broker چیزی از دست نمی‌رود:
+اجرای دوره‌ای dispatcher (Celery Beat) پنجره‌های تمام‌شده را هم ارسال می‌کند.
+"""
+import datetime
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+# عنوان و متن نوتیفیکیشن تجمیعی هر نوع
+COALESCED_MESSAGES = {
+    'assignment': ('تخصیص وظیفه‌های جدید', "{count} وظیفه به شما واگذار شد."),
+    'mention': ('تگ شدن در وظیفه‌ها', "در {count} مورد شما را تگ کرده‌اند."),
+    'overdue': ('وظیفه‌های دیرکرده', "{count} وظیفه به موعد خود رسیده است."),
+}
+DEFAULT_COALESCED_MESSAGE = ('نوتیفیکیشن‌های جدید', "{count} نوتیفیکیشن جدید دارید.")
+
+
+def get_window():
+    return getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 10)
+
+
+def is_coalesced(type_):
+    return type_ in getattr(settings, 'NOTIFICATION_COALESCE_TYPES', ()) and get_window() > 0
+
+
+def window_end(now=None):
+    window = get_window()
+    timestamp = (now or timezone.now()).timestamp()
+    return datetime.datetime.fromtimestamp((int(timestamp // window) + 1) * window, tz=datetime.timezone.utc)
+
+
+def hold(notifications):
+    """
+    held_until نوتیفیکیشن‌های انواع تجمیعی را پیش از insert پر می‌کند.
+    خروجی پایان پنجره یا None اگر هیچ‌کدام تجمیعی نباشند.
+    """
+    until = None
+    for notif in notifications:
+        if is_coalesced(notif.type):
+            until = until or window_end()
+            notif.held_until = until
+    return until
+
+
+def schedule_flush(until):
+    """
+    dispatch outbox را برای پایان پنجره زمان‌بندی می‌کند (یک بار برای هر پنجره، برای همه‌ی کاربران).
+    خطای کش یا broker فقط لاگ می‌شود؛ dispatcher دوره‌ای ردیف‌ها را دیرتر می‌فرستد.
+    """
+    from .tasks import dispatch_notification_outbox
+    key = f"notif:coalesce:flush:{int(until.timestamp())}"
+    try:
+        if cache.add(key, 1, get_window() * 2 + 60):
+            try:
+                dispatch_notification_outbox.apply_async(eta=until + datetime.timedelta(seconds=1))
+            except Exception:
+                # رویداد بعدی همین پنجره دوباره تلاش می‌کند
+                cache.delete(key)
+                raise
+    except Exception:
+        logger.exception("Could not schedule coalesced notification flush for %s", until.isoformat())
+
+
+def aggregate(type_, payloads):
+    """
+    payload های یک (کاربر، نوع) در یک پنجره: یک پیام همان‌طور که هست ارسال می‌شود و چند پیام
+    به یک پیام تجمیعی با id آخرین ردیف تبدیل می‌شوند (بازپخش با ?last_id= از بعد از آن ادامه می‌دهد).
+    """
+    if len(payloads) == 1:
+        return payloads[0]
+    title, template = COALESCED_MESSAGES.get(type_, DEFAULT_COALESCED_MESSAGE)
+    task_ids = {payload['task'] for payload in payloads}
+    latest = max(payloads, key=lambda payload: payload['id'])
+    return {
+        **latest,
+        'title': title,
+        'message': template.format(count=len(payloads)),
+        'task': task_ids.pop() if len(task_ids) == 1 else None,
+        'count': len(payloads),
+    }
@@ -1,25 +1,269 @@
 # notifications/consumers.py
-import json
+import asyncio
+import logging
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.http import AsyncHttpConsumer
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+
+from team_tasks_realtime.metrics import CONTENT_TYPE, metrics_access_allowed, registry
+from . import metrics
+from .outbound import OutboundQueue
+from .presence import get_presence
+from .protocols import get_encoder, negotiate
+
+
+logger = logging.getLogger(__name__)
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
+    replay_batch_size = getattr(settings, 'NOTIFICATION_REPLAY_BATCH_SIZE', 100)
+    replay_limit = getattr(settings, 'NOTIFICATION_REPLAY_LIMIT', 1000)
+    batch_window = getattr(settings, 'NOTIFICATION_WS_BATCH_WINDOW', 0.05)
+    batch_size = getattr(settings, 'NOTIFICATION_WS_BATCH_SIZE', 100)
+    queue_size = getattr(settings, 'NOTIFICATION_WS_QUEUE_SIZE', 1000)
+    overflow_policy = getattr(settings, 'NOTIFICATION_WS_OVERFLOW_POLICY', 'drop_oldest')
+    # کد بستن اتصال کلاینت کند (سیاست disconnect)؛ کلاینت با last_id پیام resume دوباره وصل می‌شود
+    slow_close_code = 4008
+    heartbeat_interval = getattr(settings, 'NOTIFICATION_PRESENCE_HEARTBEAT', 30)
+    # پیام‌های کنترلی اتصال که در ws_messages_delivered_total شمرده نمی‌شوند
+    control_types = {"welcome", "gap", "resume", "replay_complete"}
+
     async def connect(self):
         # همه کاربران به یک گروه اضافه میشن
         self.group_name = f"user_{self.scope['user'].id}" if self.scope['user'].is_authenticated else "anonymous"      
+        self.team_groups = set()
+        self.accepted = False
+        # id نوتیفیکیشن‌هایی که بازپخش شده‌اند تا اگر از گروه هم رسیدند دوباره ارسال نشوند
+        self.replayed_ids = set()
+        # قالب فریم از Sec-WebSocket-Protocol؛ بدون آن همان JSON متنی
+        self.subprotocol = negotiate(self.scope.get('subprotocols'))
+        self.encoder = get_encoder(self.subprotocol)
+        # با ?batch=1 رویدادهای یک پنجره‌ی کوتاه در یک فریم {"type": "batch", "events": [...]} می‌آیند
+        self.batching = self.get_query_param('batch') == '1' and self.batch_window > 0
+        # صف خروجی محدود؛ فقط writer روی سوکت می‌نویسد
+        self.outbound = OutboundQueue(self.queue_size, self.overflow_policy)
+        self.wakeup = asyncio.Event()
+        self.writer = None
+        self.in_flight = []
+        self.closing = False
+        self.last_sent_id = self.get_last_seen_id()
+        self.heartbeat = None
+        # عضویت در گروه قبل از خواندن دیتابیس: هر چه بعد از این ارسال شود در صف گروه می‌ماند
         await self.channel_layer.group_add(self.group_name, self.channel_name)
+        if self.scope['user'].is_authenticated:
+            # گروه team_<id> برای هر تیم کاربر، برای رویدادهای سطح تیم
+            await self.sync_team_groups()
+            # قبل از بازپخش: نوتیفیکیشن‌هایی که بعد از این commit شوند زنده ارسال می‌شوند
+            await get_presence().add(self.scope['user'].id, self.channel_name)
+            self.heartbeat = asyncio.ensure_future(self.heartbeat_loop())
+            self.heartbeat.add_done_callback(self.heartbeat_stopped)
 
         # اتصال WebSocket قبول میشه
-        await self.accept()
+        await self.accept(subprotocol=self.subprotocol)
+        self.accepted = True
+        self.writer = asyncio.ensure_future(self.write_loop())
+        metrics.active_connections.inc()
+        metrics.connects_total.inc(authenticated=self.scope['user'].is_authenticated)
 
         # پیام خوش‌آمدگویی
-        await self.send(text_data=json.dumps({
+        await self.send_event({
             "type": "welcome",
             "message": f"Hello {self.scope['user'].username if self.scope['user'].is_authenticated else 'Guest'}, WebSocket connected!"
-        }))
+        })
+
+        last_id = self.get_last_seen_id()
+        if self.scope['user'].is_authenticated and last_id is not None:
+            await self.replay_missed(last_id)
 
     async def disconnect(self, close_code):
+        if getattr(self, 'accepted', False):
+            metrics.active_connections.dec()
+            metrics.disconnects_total.inc()
+        if getattr(self, 'writer', None):
+            self.writer.cancel()
+        if getattr(self, 'heartbeat', None):
+            self.heartbeat.cancel()
+            await get_presence().remove(self.scope['user'].id, self.channel_name)
+        if hasattr(self, 'outbound'):
+            self.outbound.clear()
         # هنگام قطع اتصال از گروه خارج میشه
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        for group in self.team_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def send_notification(self, event):
-        await self.send(text_data=json.dumps(event["content"]))
+        notification_id = event["content"].get("id")
+        if notification_id in self.replayed_ids:
+            self.replayed_ids.discard(notification_id)
+            return
+        await self.send_event(event["content"])
+
+    async def team_event(self, event):
+        await self.send_event(event["content"])
+
+    async def send_event(self, content):
+        """رویداد در صف خروجی گذاشته می‌شود؛ اگر صف پر باشد سیاست overflow اعمال می‌شود"""
+        if self.closing:
+            return
+        if not self.outbound.put(content):
+            await self.close_slow()
+            return
+        self.wakeup.set()
+
+    async def write_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            if self.batching:
+                # رویدادهای رسیده در این پنجره با هم در یک فریم می‌روند
+                await asyncio.sleep(self.batch_window)
+            while len(self.outbound):
+                gap = self.outbound.pop_gap(self.last_sent_id)
+                if gap:
+                    await self.send_frame(gap)
+                # رویدادهای در حال ارسال برای محاسبه‌ی last_id پیام resume نگه داشته می‌شوند
+                self.in_flight = self.outbound.take(self.batch_size if self.batching else 1)
+                if self.batching:
+                    await self.send_frame({"type": "batch", "events": self.in_flight})
+                else:
+                    await self.send_frame(self.in_flight[0])
+                self.in_flight = []
+
+    async def heartbeat_loop(self):
+        # heartbeat سمت سرور: presence اتصال تا وقتی باز است تازه می‌ماند
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await get_presence().touch(self.scope['user'].id, self.channel_name)
+            except Exception:
+                # خطای موقت Redis نباید heartbeat را متوقف کند؛ presence تا TTL معتبر می‌ماند
+                logger.exception("Presence heartbeat failed for %s", self.channel_name)
+
+    def heartbeat_stopped(self, task):
+        # بدون heartbeat، presence منقضی می‌شود و dispatch دیگر به این اتصال نمی‌فرستد؛
+        # بستن اتصال کلاینت را به اتصال مجدد و بازپخش وادار می‌کند
+        if task.cancelled():
+            return
+        logger.error("Presence heartbeat stopped for %s", self.channel_name, exc_info=task.exception())
+        asyncio.ensure_future(self.close())
+
+    async def close_slow(self):
+        """سیاست disconnect: کلاینت با last_id این پیام دوباره وصل می‌شود و بقیه را از بازپخش می‌گیرد"""
+        self.closing = True
+        metrics.slow_disconnects_total.inc()
+        last_id = self.outbound.resume_id(self.last_sent_id, self.in_flight)
+        self.outbound.clear()
+        if self.writer:
+            self.writer.cancel()
+        await self.send_frame({"type": "resume", "last_id": last_id})
+        await self.close(code=self.slow_close_code)
+
+    async def send_frame(self, content):
+        frame = self.encoder.encode(content)
+        await self.send(**frame)
+        # تحویل و تأخیر وقتی ثبت می‌شوند که فریم واقعاً نوشته شده (نه هنگام صف شدن)
+        now = timezone.now()
+        for event in content.get("events", (content,)):
+            if event.get("id") is not None:
+                self.last_sent_id = event["id"]
+            if event.get("type") in self.control_types:
+                continue
+            metrics.messages_delivered_total.inc(type=event.get("type"))
+            if event.get("created"):
+                metrics.delivery_lag.observe((now - datetime.fromisoformat(event["created"])).total_seconds())
+        data = frame.get('text_data') or frame.get('bytes_data')
+        metrics.frames_sent_total.inc(protocol=self.encoder.name)
+        metrics.frame_bytes_total.inc(len(data), protocol=self.encoder.name)
+
+    async def teams_changed(self, event):
+        # عضویت کاربر در تیم‌ها تغییر کرده؛ گروه‌ها دوباره همگام می‌شوند
+        await self.sync_team_groups()
+
+    async def sync_team_groups(self):
+        team_ids = await self.fetch_team_ids()
+        groups = {f"team_{team_id}" for team_id in team_ids}
+        for group in groups - self.team_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in self.team_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.team_groups = groups
+
+    @database_sync_to_async
+    def fetch_team_ids(self):
+        from teams.cache import get_user_team_ids
+        return get_user_team_ids(self.scope['user'].id)
+
+    def get_query_param(self, name):
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        return query.get(name, [None])[0]
+
+    def get_last_seen_id(self):
+        """last_id از query string: آخرین نوتیفیکیشنی که کلاینت دریافت کرده"""
+        try:
+            return int(self.get_query_param("last_id"))
+        except (TypeError, ValueError):
+            return None
+
+    async def replay_missed(self, last_id):
+        """
+        نوتیفیکیشن‌های بعد از last_id را در batch های محدود و به ترتیب id می‌فرستد.
+        اگر تعداد از replay_limit بیشتر باشد، کلاینت باید بقیه را از API صندوق بگیرد.
+        """
+        sent = 0
+        truncated = False
+        while True:
+            batch = await self.fetch_missed(last_id, self.replay_batch_size)
+            for payload in batch:
+                self.replayed_ids.add(payload["id"])
+                await self.send_event(payload)
+            sent += len(batch)
+            if batch:
+                last_id = batch[-1]["id"]
+            if len(batch) < self.replay_batch_size:
+                break
+            if sent >= self.replay_limit:
+                truncated = True
+                break
+
+        await self.send_event({
+            "type": "replay_complete",
+            "last_id": last_id,
+            "truncated": truncated,
+        })
+
+    @database_sync_to_async
+    def fetch_missed(self, after_id, limit):
+        from .models import Notification
+        from .utils import notification_payload
+        notifications = (
+            Notification.objects.filter(user_id=self.scope['user'].id, id__gt=after_id)
+            .order_by('id')[:limit]
+        )
+        return [notification_payload(notif) for notif in notifications]
+
+
+class MetricsConsumer(AsyncHttpConsumer):
+    """
+    متریک‌های پروسس ASGI (از جمله لایه‌ی بلادرنگ) مستقیماً از Channels،
+    بدون عبور از thread pool جنگو؛ دسترسی مثل /metrics/ با METRICS_TOKEN یا METRICS_ALLOWED_IPS.
+    """
+
+    async def handle(self, body):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            await self.send_response(404, b"Not Found", headers=[(b"Content-Type", b"text/plain")])
+            return
+        client_ip = (self.scope.get('client') or (None,))[0]
+        authorization = dict(self.scope.get('headers', [])).get(b'authorization', b'').decode('latin-1')
+        if not metrics_access_allowed(client_ip, authorization):
+            await self.send_response(403, b"Forbidden", headers=[(b"Content-Type", b"text/plain")])
+            return
+        await self.send_response(
+            200,
+            registry.render().encode(),
+            headers=[(b"Content-Type", CONTENT_TYPE.encode())],
+        )
@@ -0,0 +1,63 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import Notification, NotificationCounter
+
+
+def _count_unread(user_ids, exclude_ids=()):
+    return dict(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .exclude(id__in=exclude_ids)
+        .values('user_id')
+        .annotate(n=Count('id'))
+        .values_list('user_id', 'n')
+    )
+
+
+def increment_unread(notifications):
+    """
+    شمارنده‌ی خوانده‌نشده‌ها را به ازای هر نوتیفیکیشن تازه insert شده یکی زیاد می‌کند.
+    کاربری که هنوز شمارنده ندارد ابتدا با شمارش ردیف‌های قبلی (بدون ردیف‌های همین فراخوانی)
+    ساخته می‌شود. ساخت با ignore_conflicts و افزایش همیشه با F() است؛ اگر transaction
+    همزمانی شمارنده را زودتر بسازد، افزایش این فراخوانی روی همان ردیف اعمال می‌شود.
+    """
+    notifications = list(notifications)
+    increments = Counter(notif.user_id for notif in notifications)
+    if not increments:
+        return
+
+    existing = set(
+        NotificationCounter.objects.filter(user_id__in=increments).values_list('user_id', flat=True)
+    )
+    missing = [user_id for user_id in increments if user_id not in existing]
+    if missing:
+        unread = _count_unread(missing, exclude_ids=[notif.pk for notif in notifications])
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id, unread=unread.get(user_id, 0)) for user_id in missing],
+            ignore_conflicts=True
+        )
+
+    # کاربران با افزایش یکسان با یک UPDATE به‌روز می‌شوند
+    by_amount = defaultdict(list)
+    for user_id, amount in increments.items():
+        by_amount[amount].append(user_id)
+    for amount, ids in by_amount.items():
+        NotificationCounter.objects.filter(user_id__in=ids).update(unread=F('unread') + amount)
+
+
+def decrement_unread(user_id, amount):
+    if amount:
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread=Greatest(F('unread') - amount, 0)
+        )
+
+
+def get_unread_count(user_id):
+    unread = NotificationCounter.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+    if unread is None:
+        # اولین بار: یک شمارش کامل و ذخیره‌ی نتیجه
+        unread = _count_unread([user_id]).get(user_id, 0)
+        NotificationCounter.objects.get_or_create(user_id=user_id, defaults={'unread': unread})
+    return unread
@@ -0,0 +1,56 @@
+"""متریک‌های لایه‌ی بلادرنگ (Channels): اتصال‌ها، احراز هویت، group_send و تأخیر تحویل"""
+from team_tasks_realtime.metrics import registry
+
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+active_connections = registry.gauge(
+    'ws_active_connections', "Open WebSocket connections in this process"
+)
+connects_total = registry.counter(
+    'ws_connects_total', "Accepted WebSocket connections", ('authenticated',)
+)
+disconnects_total = registry.counter(
+    'ws_disconnects_total', "Closed WebSocket connections"
+)
+auth_duration = registry.histogram(
+    'ws_auth_duration_seconds', "Token authentication time in TokenAuthMiddleware", ('result',),
+    buckets=FAST_BUCKETS
+)
+group_send_duration = registry.histogram(
+    'channel_group_send_duration_seconds', "channel_layer.group_send latency", ('group',),
+    buckets=FAST_BUCKETS
+)
+# در worker های Celery ثبت می‌شود؛ مقدار در کش مشترک است تا /metrics پروسس‌های وب آن را نشان دهد
+sends_skipped_offline_total = registry.shared_counter(
+    'notification_sends_skipped_offline_total', "Outbox notifications not published because the user had no live connection"
+)
+messages_delivered_total = registry.counter(
+    'ws_messages_delivered_total', "Events written to WebSocket connections", ('type',)
+)
+frames_sent_total = registry.counter(
+    'ws_frames_sent_total', "WebSocket frames written (one batch frame may carry many events)", ('protocol',)
+)
+frame_bytes_total = registry.counter(
+    'ws_frame_bytes_total', "Payload bytes written to WebSocket connections", ('protocol',)
+)
+outbound_queued = registry.gauge(
+    'ws_outbound_queued_events', "Events waiting in per-connection outbound queues in this process"
+)
+events_dropped_total = registry.counter(
+    'ws_events_dropped_total', "Events dropped because a connection's outbound queue was full", ('policy',)
+)
+events_coalesced_total = registry.counter(
+    'ws_events_coalesced_total', "Events merged into a queued event for the same task and type"
+)
+slow_disconnects_total = registry.counter(
+    'ws_slow_disconnects_total', "Connections closed because their outbound queue overflowed"
+)
+delivery_lag = registry.histogram(
+    'notification_delivery_lag_seconds', "Time from Notification creation to WebSocket frame"
+)
+
+
+def group_kind(group):
+    # user_12 -> user, team_3 -> team
+    return group.split('_', 1)[0]
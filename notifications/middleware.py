@@ -1,18 +1,26 @@
-from channels.db import database_sync_to_async
+import logging
+import time
+from urllib.parse import parse_qs
+
 from channels.middleware import BaseMiddleware
 
-@database_sync_to_async
-def get_user_from_token(token_key: str):
+from .metrics import auth_duration
+
+
+logger = logging.getLogger(__name__)
+
+
+async def get_user_from_token(token_key: str):
     from django.contrib.auth.models import AnonymousUser  # ایمپورت داخل متد
-    from rest_framework.authtoken.models import Token
+    from auth_api.authentication import aload_token
     """
-    بررسی توکن و گرفتن کاربر
+    بررسی توکن و گرفتن کاربر.
+    اگر توکن در token_cache باشد بدون رفتن به دیتابیس برگردانده می‌شود.
     """
-    try:
-        token = Token.objects.get(key=token_key)
-        return token.user
-    except Token.DoesNotExist:
+    value = await aload_token(token_key)
+    if value is None or not value[0].is_active:
         return AnonymousUser()
+    return value[0]
 
 class TokenAuthMiddleware(BaseMiddleware):
     """
@@ -23,19 +31,18 @@ class TokenAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
         from django.contrib.auth.models import AnonymousUser  # ایمپورت داخل متد
         query_string = scope.get("query_string", b"").decode()
-        token_key = None
 
         # استخراج توکن از query string
-        try:
-            params = dict(x.split('=') for x in query_string.split("&") if "=" in x)
-            token_key = params.get("token")
-        except Exception:
-            token_key = None
+        token_key = parse_qs(query_string).get("token", [None])[0]
 
+        start = time.perf_counter()
         scope["user"] = await get_user_from_token(token_key) if token_key else AnonymousUser()
-                # پرینت واضح برای debug
+        auth_duration.observe(
+            time.perf_counter() - start,
+            result="authenticated" if scope["user"].is_authenticated else "anonymous"
+        )
         if scope["user"].is_authenticated:
-            print(f"[Middleware] ✅ Authenticated user: {scope['user'].username} (id={scope['user'].id})")
+            logger.debug("WebSocket authenticated user %s (id=%s)", scope["user"].username, scope["user"].id)
         else:
-            print(f"[Middleware] ❌ AnonymousUser (token={token_key})")
+            logger.debug("WebSocket anonymous connection")
         return await super().__call__(scope, receive, send)
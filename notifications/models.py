@@ -25,12 +25,41 @@ class Notification(models.Model):
         blank=True,
         on_delete=models.SET_NULL
     )
-
+    is_read = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+    # outbox: تا وقتی خالی است، ارسال WebSocket این ردیف هنوز انجام نشده
+    pushed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # انواع تجمیعی (coalescing.py): تا این زمان ارسال زنده نمی‌شود و بعد با ردیف‌های هم‌پنجره یک پیام می‌شود
+    held_until = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         indexes = [
-            models.Index(fields=['user']),
+            # صفحه‌بندی keyset صندوق پیام‌ها روی (user, created)
+            models.Index(fields=['user', 'created'], name='notif_user_created_idx'),
+            # dispatcher فقط ردیف‌های ارسال‌نشده را به ترتیب id می‌خواند
+            models.Index(
+                fields=['id'],
+                name='notif_outbox_pending_idx',
+                condition=models.Q(pushed_at__isnull=True)
+            ),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.type} - {self.title}"
+
+
+class NotificationCounter(models.Model):
+    """
+    شمارنده‌ی پیام‌های خوانده‌نشده‌ی هر کاربر.
+    به صورت افزایشی به‌روز می‌شود تا badge بدون COUNT(*) روی تاریخچه خوانده شود.
+    """
+    user = models.OneToOneField(
+        User,
+        related_name='notification_counter',
+        primary_key=True,
+        on_delete=models.CASCADE
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} - {self.unread}"
@@ -0,0 +1,119 @@
+"""
+صف خروجی محدود هر اتصال WebSocket.
+رویدادها از channel layer فقط در صف گذاشته می‌شوند و writer اتصال آن‌ها را می‌فرستد؛
+اگر کلاینت کند باشد (send منتظر بماند) صف پر می‌شود و به جای رشد بی‌حد حافظه‌ی
+پروسس، سیاست NOTIFICATION_WS_OVERFLOW_POLICY اعمال می‌شود:
+
+- drop_oldest: قدیمی‌ترین رویداد صف حذف می‌شود
+- coalesce: رویداد با رویداد هم‌نوع همان تسک در صف ادغام می‌شود (diff فیلدها و added/removed
+  تگ‌ها با هم merge می‌شوند) و اگر چنین رویدادی نباشد مثل drop_oldest رفتار می‌کند
+- disconnect: اتصال با یک پیام resume بسته می‌شود تا کلاینت با ?last_id= دوباره وصل شود
+
+نوتیفیکیشن‌ها در دیتابیس ذخیره شده‌اند؛ پس بعد از هر حذف، کلاینت یک پیام gap با
+last_id برای بازپخش (یا sync تسک‌ها) می‌گیرد.
+"""
+from collections import deque
+
+from . import metrics
+
+
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+DISCONNECT = 'disconnect'
+POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+
+def coalesce_key(content):
+    return (content.get('type'), content.get('task'))
+
+
+def merge(queued, content):
+    """رویداد جدید جای رویداد قبلی را می‌گیرد؛ diff فیلدها و تغییر تگ‌ها با هم جمع می‌شوند"""
+    if isinstance(queued.get('changes'), dict) and isinstance(content.get('changes'), dict):
+        return {**content, 'changes': {**queued['changes'], **content['changes']}}
+    if 'added' in queued and 'added' in content:
+        # task.tags: نتیجه‌ی خالص دو تغییر؛ حذف بعدی، افزودن قبلی همان کاربر را خنثی می‌کند و برعکس
+        added, removed = set(content['added']), set(content['removed'])
+        return {
+            **content,
+            'added': sorted(added | (set(queued['added']) - removed)),
+            'removed': sorted(removed | (set(queued['removed']) - added)),
+        }
+    return content
+
+
+class OutboundQueue:
+
+    def __init__(self, maxsize, policy=DROP_OLDEST):
+        self.maxsize = maxsize
+        self.policy = policy if policy in POLICIES else DROP_OLDEST
+        self.items = deque()
+        # تعداد رویدادهای از دست رفته از آخرین پیام gap و کوچک‌ترین id نوتیفیکیشن حذف‌شده
+        self.lost = 0
+        self.first_lost_id = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, content):
+        """False یعنی صف پر است و سیاست disconnect باید اجرا شود"""
+        if len(self.items) >= self.maxsize:
+            if self.policy == DISCONNECT:
+                return False
+            if self.policy == COALESCE and self.coalesce(content):
+                return True
+            self.discard(self.items.popleft())
+            metrics.events_dropped_total.inc(policy=self.policy)
+        else:
+            metrics.outbound_queued.inc()
+        self.items.append(content)
+        return True
+
+    def coalesce(self, content):
+        key = coalesce_key(content)
+        for index in range(len(self.items) - 1, -1, -1):
+            queued = self.items[index]
+            if coalesce_key(queued) == key:
+                del self.items[index]
+                if queued.get('id') != content.get('id'):
+                    self.discard(queued, counted=False)
+                self.items.append(merge(queued, content))
+                metrics.events_coalesced_total.inc()
+                return True
+        return False
+
+    def discard(self, content, counted=True):
+        if counted:
+            self.lost += 1
+        notification_id = content.get('id')
+        if notification_id is not None and (self.first_lost_id is None or notification_id < self.first_lost_id):
+            self.first_lost_id = notification_id
+
+    def take(self, limit):
+        count = min(limit, len(self.items))
+        items = [self.items.popleft() for _ in range(count)]
+        metrics.outbound_queued.dec(count)
+        return items
+
+    def clear(self):
+        metrics.outbound_queued.dec(len(self.items))
+        self.items.clear()
+
+    def resume_id(self, last_sent_id, in_flight=()):
+        """last_id که کلاینت برای دریافت دوباره‌ی نوتیفیکیشن‌های نرسیده باید بفرستد"""
+        candidates = [
+            content['id'] for content in (*in_flight, *self.items) if content.get('id') is not None
+        ]
+        if self.first_lost_id is not None:
+            candidates.append(self.first_lost_id)
+        return min(candidates) - 1 if candidates else last_sent_id
+
+    def pop_gap(self, last_sent_id):
+        """پیام gap اگر از آخرین ارسال رویدادی از دست رفته باشد"""
+        if not self.lost and self.first_lost_id is None:
+            return None
+        last_id = self.first_lost_id - 1 if self.first_lost_id is not None else last_sent_id
+        gap = {"type": "gap", "dropped": self.lost, "last_id": last_id}
+        self.lost = 0
+        self.first_lost_id = None
+        return gap
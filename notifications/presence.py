@@ -0,0 +1,124 @@
+"""
+ثبت کاربران آنلاین تا dispatch فقط برای کاربرانی group_send کند که سوکت باز دارند.
+NotificationConsumer هنگام اتصال، قطع اتصال و هر NOTIFICATION_PRESENCE_HEARTBEAT ثانیه
+presence را به‌روز می‌کند و اتصالی که بیش از NOTIFICATION_PRESENCE_TTL ثانیه heartbeat
+نداشته باشد (مثلاً پروسس daphne از کار افتاده) آفلاین حساب می‌شود.
+کاربر آفلاین چیزی از دست نمی‌دهد: نوتیفیکیشن‌ها در دیتابیس هستند و هنگام اتصال با
+?last_id= بازپخش می‌شوند.
+
+- ChannelLayerPresence (پیش‌فرض): عضویت channel در گروه user_<id> خود channel layer؛
+  group_add زمان عضویت را ثبت می‌کند و heartbeat همان را تازه می‌کند. بررسی گروهی
+  با یک pipeline از ZCOUNT برای هر shard ردیس انجام می‌شود.
+- LocalPresence: دیکشنری داخل پروسس؛ فقط وقتی dispatch و consumer در یک پروسس‌اند (توسعه و تست).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def get_ttl():
+    return getattr(settings, 'NOTIFICATION_PRESENCE_TTL', 90)
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+class BasePresence:
+
+    async def add(self, user_id, channel_name):
+        pass
+
+    async def touch(self, user_id, channel_name):
+        await self.add(user_id, channel_name)
+
+    async def remove(self, user_id, channel_name):
+        pass
+
+    async def online(self, channel_layer, user_ids):
+        """زیرمجموعه‌ی user_ids که حداقل یک اتصال زنده دارند"""
+        return set(user_ids)
+
+
+class LocalPresence(BasePresence):
+    _lock = threading.Lock()
+    _channels = {}
+
+    async def add(self, user_id, channel_name):
+        with self._lock:
+            self._channels.setdefault(user_id, {})[channel_name] = time.time()
+
+    async def remove(self, user_id, channel_name):
+        with self._lock:
+            channels = self._channels.get(user_id, {})
+            channels.pop(channel_name, None)
+            if not channels:
+                self._channels.pop(user_id, None)
+
+    async def online(self, channel_layer, user_ids):
+        cutoff = time.time() - get_ttl()
+        with self._lock:
+            return {
+                user_id for user_id in user_ids
+                if any(seen >= cutoff for seen in self._channels.get(user_id, {}).values())
+            }
+
+
+class ChannelLayerPresence(BasePresence):
+
+    def __init__(self, channel_layer=None):
+        self.channel_layer = channel_layer
+
+    def get_layer(self):
+        if self.channel_layer is None:
+            from channels.layers import get_channel_layer
+            self.channel_layer = get_channel_layer()
+        return self.channel_layer
+
+    async def add(self, user_id, channel_name):
+        # consumer در همین گروه عضو است؛ group_add دوباره فقط زمان عضویت را تازه می‌کند
+        await self.get_layer().group_add(user_group(user_id), channel_name)
+
+    async def remove(self, user_id, channel_name):
+        await self.get_layer().group_discard(user_group(user_id), channel_name)
+
+    async def online(self, channel_layer, user_ids):
+        layer = channel_layer or self.get_layer()
+        user_ids = list(user_ids)
+        cutoff = time.time() - get_ttl()
+        if hasattr(layer, '_group_key') and hasattr(layer, 'connection'):
+            return await self._redis_online(layer, user_ids, cutoff)
+        if isinstance(getattr(layer, 'groups', None), dict):
+            # InMemoryChannelLayer: {group: {channel: زمان عضویت}}
+            return {
+                user_id for user_id in user_ids
+                if any(joined >= cutoff for joined in layer.groups.get(user_group(user_id), {}).values())
+            }
+        # لایه‌ای که عضویت گروه را قابل پرس‌وجو نگه نمی‌دارد: همه آنلاین فرض می‌شوند
+        return set(user_ids)
+
+    async def _redis_online(self, layer, user_ids, cutoff):
+        shards = {}
+        for user_id in user_ids:
+            shards.setdefault(layer.consistent_hash(user_group(user_id)), []).append(user_id)
+        online = set()
+        for index, shard_user_ids in shards.items():
+            pipe = layer.connection(index).pipeline(transaction=False)
+            for user_id in shard_user_ids:
+                pipe.zcount(layer._group_key(user_group(user_id)), cutoff, '+inf')
+            counts = await pipe.execute()
+            online.update(user_id for user_id, count in zip(shard_user_ids, counts) if count)
+        return online
+
+
+_presence = None
+
+
+def get_presence():
+    global _presence
+    if _presence is None:
+        path = getattr(settings, 'NOTIFICATION_PRESENCE_BACKEND', 'notifications.presence.ChannelLayerPresence')
+        _presence = import_string(path)()
+    return _presence
@@ -0,0 +1,67 @@
+"""
+قالب فریم‌های WebSocket که با هدر Sec-WebSocket-Protocol انتخاب می‌شود.
+
+- بدون subprotocol یا json: همان JSON متنی قبلی (پیش‌فرض کلاینت‌های قدیمی)
+- msgpack: فریم باینری MessagePack
+- deflate-json: فریم باینری JSON فشرده با deflate خام (wbits=-15) و context مشترک
+  در طول اتصال؛ هر فریم با Z_SYNC_FLUSH تمام می‌شود، پس کلاینت باید یک inflater
+  برای کل اتصال نگه دارد (مثل permessage-deflate). کلیدهای تکراری رویدادها بین
+  فریم‌ها هم فشرده می‌شوند.
+
+اولین subprotocol پشتیبانی‌شده در لیست کلاینت انتخاب می‌شود.
+"""
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # msgpack همراه channels_redis نصب می‌شود
+    msgpack = None
+
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+DEFLATE_JSON = 'deflate-json'
+
+
+class JSONFrameEncoder:
+    name = JSON
+
+    def encode(self, content):
+        return {'text_data': json.dumps(content)}
+
+
+class MsgpackFrameEncoder:
+    name = MSGPACK
+
+    def encode(self, content):
+        return {'bytes_data': msgpack.packb(content, use_bin_type=True)}
+
+
+class DeflateJSONFrameEncoder:
+    name = DEFLATE_JSON
+
+    def __init__(self):
+        self.compressor = zlib.compressobj(wbits=-15)
+
+    def encode(self, content):
+        raw = json.dumps(content, separators=(',', ':'), ensure_ascii=False).encode()
+        return {'bytes_data': self.compressor.compress(raw) + self.compressor.flush(zlib.Z_SYNC_FLUSH)}
+
+
+ENCODERS = {JSON: JSONFrameEncoder, DEFLATE_JSON: DeflateJSONFrameEncoder}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = MsgpackFrameEncoder
+
+
+def negotiate(requested):
+    """subprotocol انتخاب‌شده یا None اگر کلاینت subprotocol پشتیبانی‌شده‌ای نخواسته باشد"""
+    for name in requested or ():
+        if name in ENCODERS:
+            return name
+    return None
+
+
+def get_encoder(subprotocol):
+    # هر اتصال encoder خودش را دارد (deflate وضعیت دارد)
+    return ENCODERS.get(subprotocol, JSONFrameEncoder)()
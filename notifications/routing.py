@@ -1,7 +1,14 @@
-from django.urls import re_path
-from .consumers import NotificationConsumer
+from django.urls import path, re_path
+from .consumers import MetricsConsumer, NotificationConsumer
 
 def get_websocket_urlpatterns():
     return [
         re_path(r'ws/notifications/$', NotificationConsumer.as_asgi()),
-    ]
\ No newline at end of file
+    ]
+
+
+def get_http_urlpatterns(django_asgi_app):
+    return [
+        path('metrics/realtime/', MetricsConsumer.as_asgi()),
+        re_path(r'', django_asgi_app),
+    ]
@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+
+from teams.signals import membership_changed
+from .utils import notify_membership_changed
+
+
+@receiver(membership_changed)
+def sync_team_groups(sender, team_ids, user_ids, **kwargs):
+    if user_ids:
+        # membership_changed خودش بعد از commit ارسال می‌شود
+        notify_membership_changed(set(user_ids))
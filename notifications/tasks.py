@@ -1,13 +1,20 @@
 # notifications/tasks.py
 
+import logging
+
 from celery import shared_task
-from datetime import datetime
 from django.contrib.auth.models import User
 from tasks.models import Task
-from .utils import send_realtime_notification
+from .utils import (
+    broadcast_team_events, dispatch_pending_notifications, send_bulk_realtime_notifications, send_realtime_notification,
+)
+from django.db import transaction
 from django.utils import timezone
 
 
+logger = logging.getLogger(__name__)
+
+
 @shared_task
 def send_task_notification(user_id, type_, title, message, task_id=None):
     """
@@ -36,31 +43,76 @@ def send_task_notification(user_id, type_, title, message, task_id=None):
 
 
 
+@shared_task(ignore_result=True)
+def dispatch_notification_outbox():
+    """
+    ارسال WebSocket نوتیفیکیشن‌های commit شده (outbox).
+    بعد از هر commit صدا زده می‌شود و Celery Beat هم به صورت دوره‌ای اجرایش می‌کند
+    تا ردیف‌هایی که به خاطر ری‌استارت یا قطعی broker جا مانده‌اند (و پنجره‌های تجمیع
+    تمام‌شده) هم ارسال شوند.
+    """
+    pushed = dispatch_pending_notifications()
+    if pushed:
+        logger.debug("Outbox dispatch pushed %d notification(s)", pushed)
+    return pushed
+
+
+@shared_task(ignore_result=True)
+def broadcast_team_events_task(events):
+    """ارسال رویدادهای تسک به اعضای آنلاین تیم؛ بعد از commit از publish_task_events صدا زده می‌شود"""
+    broadcast_team_events(events)
+
+
 DEFAULT_USER_ID = 1  # ID کاربر anonymous یا پیش‌فرض
+OVERDUE_SCAN_BATCH_SIZE = 500
+
 
 @shared_task
 def check_overdue_tasks():
+    """
+    فقط تسک‌هایی را بررسی می‌کند که موعدشان گذشته و هنوز بابت دیرکرد اطلاع‌رسانی نشده‌اند.
+    پس از ارسال، overdue_notified_at پر می‌شود تا تسک در اجرای بعدی دوباره اسکن نشود؛
+    بنابراین هزینه‌ی هر اجرا متناسب با تسک‌های تازه دیرکرده است نه کل جدول.
+    هر batch با select_for_update(skip_locked=True) برداشته می‌شود تا اجراهای همپوشان
+    یک تسک را دو بار اطلاع‌رسانی نکنند. تغییر due_date علامت را پاک می‌کند (Task.save).
+    """
     now = timezone.now()
-    print(f"[CELERY] Current datetime (aware): {now} ({type(now)})")
+    pending = (
+        Task.objects.filter(overdue_notified_at__isnull=True, due_date__lte=now)
+        .order_by('due_date', 'id')
+        .values_list('id', 'title', 'assignee_id')
+    )
 
-    overdue_tasks = Task.objects.all()
-    for task in overdue_tasks:
-        due_date = task.due_date
-        print(f"[CELERY] Task '{task.title}' due_date: {due_date} ({type(due_date)})")
+    # کاربر پیش‌فرض یک بار برای کل اجرا بررسی می‌شود
+    default_user_id = User.objects.filter(id=DEFAULT_USER_ID).values_list('id', flat=True).first()
 
-        # مطمئن شدن که due_date timezone-aware است
-        if timezone.is_naive(due_date):
-            due_date = timezone.make_aware(due_date, timezone=timezone.get_default_timezone())
+    notified = 0
+    while True:
+        # نوتیفیکیشن‌ها و علامت overdue_notified_at با هم commit می‌شوند
+        with transaction.atomic():
+            # ردیف‌های علامت‌خورده از فیلتر خارج می‌شوند، پس هر بار اولین batch را می‌خوانیم؛
+            # ردیف‌هایی که اجرای همزمان دیگری برداشته قفل‌اند و رد می‌شوند
+            batch = list(pending.select_for_update(skip_locked=True)[:OVERDUE_SCAN_BATCH_SIZE])
+            if not batch:
+                break
 
-        if due_date < now:
             # اگر assignee ندارد، کاربر پیش‌فرض را استفاده کن
-            user = task.assignee if task.assignee else User.objects.get(id=DEFAULT_USER_ID)
-
-            send_task_notification.delay(
-                user_id=user.id,
-                type_='overdue',
-                title='وظیفه دیرکرده',
-                message=f"وظیفه '{task.title}' به موعد خودش رسیده است.",
-                task_id=task.id
-            )
-            print(f"[CELERY] Task '{task.title}' is overdue! Notification sent to user ID: {user.id}")
\ No newline at end of file
+            send_bulk_realtime_notifications([
+                (
+                    assignee_id or default_user_id,
+                    'overdue',
+                    'وظیفه دیرکرده',
+                    f"وظیفه '{title}' به موعد خودش رسیده است.",
+                    task_id,
+                )
+                for task_id, title, assignee_id in batch
+                if assignee_id or default_user_id
+            ])
+
+            Task.objects.filter(id__in=[row[0] for row in batch]).update(overdue_notified_at=now)
+        notified += len(batch)
+        if len(batch) < OVERDUE_SCAN_BATCH_SIZE:
+            break
+
+    logger.info("Overdue scan at %s notified %d task(s)", now.isoformat(), notified)
+    return notified
@@ -1,3 +1,507 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import zlib
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from team_tasks_realtime.testing import LOCAL_SETTINGS
+from teams.models import Team
+from . import metrics
+from .consumers import MetricsConsumer, NotificationConsumer
+from .models import Notification, NotificationCounter
+from .outbound import COALESCE, DISCONNECT, DROP_OLDEST, OutboundQueue
+from .protocols import DEFLATE_JSON, JSON, MSGPACK, get_encoder, msgpack, negotiate
+from .counters import decrement_unread, get_unread_count, increment_unread
+from .presence import BasePresence
+from .utils import (
+    dispatch_pending_notifications, notification_payload, notify_membership_changed, send_bulk_realtime_notifications,
+)
+
+
+def dispatch_and_collect():
+    layer = mock.Mock(group_send=mock.AsyncMock())
+    with mock.patch('notifications.utils.get_channel_layer', return_value=layer):
+        dispatch_pending_notifications()
+    return [call.args[1]['content'] for call in layer.group_send.call_args_list]
+
+
+@override_settings(NOTIFICATION_COALESCE_TYPES=('assignment',), NOTIFICATION_COALESCE_WINDOW=10, **LOCAL_SETTINGS)
+class CoalescingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        patcher = mock.patch('notifications.utils.get_presence', return_value=BasePresence())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_held_rows_are_stored_and_sent_as_one_message_after_window(self):
+        with mock.patch('notifications.tasks.dispatch_notification_outbox.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                send_bulk_realtime_notifications([
+                    (self.user, 'assignment', 'تخصیص', f'وظیفه {index}', None) for index in range(3)
+                ] + [(self.user, 'mention', 'تگ', 'تگ شدید', None)])
+        # یک flush برای کل پنجره زمان‌بندی می‌شود
+        flushes = [call for call in apply_async.call_args_list if 'eta' in call.kwargs]
+        self.assertEqual(len(flushes), 1)
+        # صندوق پیام و شمارنده همه‌ی ردیف‌ها را فوراً دارند
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(get_unread_count(self.user.pk), 4)
+
+        payloads = dispatch_and_collect()
+        self.assertEqual([payload['type'] for payload in payloads], ['mention'])
+
+        Notification.objects.update(held_until=timezone.now() - datetime.timedelta(seconds=1))
+        payloads = dispatch_and_collect()
+        self.assertEqual(len(payloads), 1)
+        last_id = Notification.objects.filter(type='assignment').order_by('-id').first().id
+        self.assertEqual(payloads[0]['id'], last_id)
+        self.assertEqual(payloads[0]['count'], 3)
+        self.assertFalse(Notification.objects.filter(pushed_at__isnull=True).exists())
+
+    def test_broker_failure_keeps_events(self):
+        with mock.patch(
+            'notifications.tasks.dispatch_notification_outbox.apply_async', side_effect=OSError
+        ), self.assertLogs('notifications.coalescing', 'ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                send_bulk_realtime_notifications([(self.user, 'assignment', 'تخصیص', 'وظیفه', None)])
+                send_bulk_realtime_notifications([(self.user, 'assignment', 'تخصیص', 'وظیفه', None)])
+        # هر دو رویداد پنجره دوباره برای زمان‌بندی flush تلاش کرده‌اند
+        self.assertEqual(len(logs.records), 2)
+        Notification.objects.update(held_until=timezone.now() - datetime.timedelta(seconds=1))
+        # dispatcher دوره‌ای پنجره‌ی تمام‌شده را می‌فرستد
+        payloads = dispatch_and_collect()
+        self.assertEqual([payload['count'] for payload in payloads], [2])
+
+
+class OutboundQueueTests(TestCase):
+
+    def test_drop_oldest_reports_gap_from_first_lost_id(self):
+        queue = OutboundQueue(2, DROP_OLDEST)
+        for notification_id in (10, 11, 12):
+            queue.put({'type': 'assignment', 'id': notification_id, 'task': notification_id})
+        self.assertEqual([item['id'] for item in queue.take(5)], [11, 12])
+        self.assertEqual(queue.pop_gap(last_sent_id=9), {'type': 'gap', 'dropped': 1, 'last_id': 9})
+        self.assertIsNone(queue.pop_gap(last_sent_id=12))
+
+    def test_disconnect_refuses_when_full(self):
+        queue = OutboundQueue(1, DISCONNECT)
+        self.assertTrue(queue.put({'type': 'assignment', 'id': 5}))
+        self.assertFalse(queue.put({'type': 'assignment', 'id': 6}))
+        self.assertEqual(queue.resume_id(last_sent_id=4), 4)
+        queue.clear()
+
+    def test_coalesce_merges_field_changes(self):
+        queue = OutboundQueue(2, COALESCE)
+        queue.put({'type': 'task.updated', 'task': 1, 'changes': {'title': 'a', 'priority': 'low'}})
+        queue.put({'type': 'task.updated', 'task': 2, 'changes': {'title': 'x'}})
+        queue.put({'type': 'task.updated', 'task': 1, 'changes': {'title': 'b'}})
+        self.assertEqual(queue.take(5), [
+            {'type': 'task.updated', 'task': 2, 'changes': {'title': 'x'}},
+            {'type': 'task.updated', 'task': 1, 'changes': {'title': 'b', 'priority': 'low'}},
+        ])
+        self.assertIsNone(queue.pop_gap(last_sent_id=0))
+
+    def test_coalesce_keeps_net_tag_changes(self):
+        queue = OutboundQueue(1, COALESCE)
+        queue.put({'type': 'task.tags', 'task': 1, 'added': [3, 4], 'removed': [5]})
+        queue.put({'type': 'task.tags', 'task': 1, 'added': [5], 'removed': [4, 6]})
+        self.assertEqual(queue.take(1), [{'type': 'task.tags', 'task': 1, 'added': [3, 5], 'removed': [4, 6]}])
+
+
+class DeliveryMetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.messages_delivered_total.clear()
+        self.consumer = NotificationConsumer()
+        self.consumer.encoder = get_encoder(None)
+        self.consumer.last_sent_id = None
+        self.consumer.send = mock.AsyncMock()
+
+    async def test_counted_when_frame_is_written(self):
+        created = timezone.now().isoformat()
+        await self.consumer.send_frame({'type': 'batch', 'events': [
+            {'type': 'assignment', 'id': 3, 'created': created},
+            {'type': 'task.updated', 'task': 1, 'changes': {}},
+        ]})
+        await self.consumer.send_frame({'type': 'gap', 'dropped': 1, 'last_id': 3})
+        self.assertEqual(metrics.messages_delivered_total.value(type='assignment'), 1)
+        self.assertEqual(metrics.messages_delivered_total.value(type='task.updated'), 1)
+        self.assertEqual(metrics.messages_delivered_total.value(type='gap'), 0)
+        self.assertEqual(self.consumer.last_sent_id, 3)
+
+    async def test_queued_events_are_not_counted(self):
+        self.consumer.outbound = OutboundQueue(10)
+        self.consumer.closing = False
+        self.consumer.wakeup = mock.Mock()
+        self.consumer.replayed_ids = set()
+        await self.consumer.send_notification({'content': {'type': 'assignment', 'id': 4}})
+        self.assertEqual(len(self.consumer.outbound), 1)
+        self.assertEqual(metrics.messages_delivered_total.value(type='assignment'), 0)
+        self.consumer.outbound.clear()
+
+
+@override_settings(**LOCAL_SETTINGS)
+class HeartbeatTests(TestCase):
+
+    def setUp(self):
+        self.consumer = NotificationConsumer()
+        self.consumer.scope = {'user': mock.Mock(id=1)}
+        self.consumer.channel_name = 'test.channel'
+        self.consumer.heartbeat_interval = 0
+        self.consumer.close = mock.AsyncMock()
+
+    async def test_presence_error_does_not_stop_heartbeat(self):
+        presence = mock.Mock(touch=mock.AsyncMock(side_effect=[OSError, None, None]))
+        with mock.patch('notifications.consumers.get_presence', return_value=presence), \
+                self.assertLogs('notifications.consumers', 'ERROR'):
+            heartbeat = asyncio.ensure_future(self.consumer.heartbeat_loop())
+            while presence.touch.await_count < 3:
+                await asyncio.sleep(0)
+            self.assertFalse(heartbeat.done())
+            heartbeat.cancel()
+
+    async def test_dead_heartbeat_closes_connection(self):
+        async def crash():
+            raise RuntimeError
+
+        heartbeat = asyncio.ensure_future(crash())
+        heartbeat.add_done_callback(self.consumer.heartbeat_stopped)
+        with self.assertLogs('notifications.consumers', 'ERROR'):
+            for _ in range(10):
+                await asyncio.sleep(0)
+        self.consumer.close.assert_awaited_once()
+
+
+@override_settings(**LOCAL_SETTINGS)
+class SharedMetricTests(TestCase):
+
+    def test_worker_side_counter_is_read_from_cache(self):
+        cache.clear()
+        metrics.sends_skipped_offline_total.inc(3)
+        # پروسس دیگری که فقط همان کش را می‌بیند
+        self.assertEqual(cache.get('metrics:notification_sends_skipped_offline_total'), 3)
+        self.assertIn('notification_sends_skipped_offline_total 3', metrics.registry.render())
+
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-secret', METRICS_ALLOWED_IPS=[])
+class MetricsConsumerTests(TestCase):
+
+    def get(self, headers=()):
+        communicator = HttpCommunicator(MetricsConsumer.as_asgi(), 'GET', '/metrics/realtime/', headers=list(headers))
+        return async_to_sync(communicator.get_response)()
+
+    def test_requires_scrape_token(self):
+        self.assertEqual(self.get()['status'], 403)
+        self.assertEqual(self.get([(b'authorization', b'Bearer wrong')])['status'], 403)
+        response = self.get([(b'authorization', b'Bearer scrape-secret')])
+        self.assertEqual(response['status'], 200)
+        self.assertIn(b'ws_active_connections', response['body'])
+
+@override_settings(**LOCAL_SETTINGS)
+class OutboxDispatchTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        patcher = mock.patch('notifications.utils.get_presence', return_value=BasePresence())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch('notifications.utils.schedule_outbox_dispatch'):
+            send_bulk_realtime_notifications([(self.user, 'mention', 'تگ', 'تگ شدید', None)] * 2)
+
+    def test_sends_after_batch_is_committed(self):
+        in_transaction = []
+
+        async def group_send(group, message):
+            in_transaction.append(connection.in_atomic_block)
+
+        with mock.patch('notifications.utils.get_channel_layer', return_value=mock.Mock(group_send=group_send)):
+            self.assertEqual(dispatch_pending_notifications(), 2)
+        self.assertEqual(in_transaction, [False, False])
+        self.assertFalse(Notification.objects.filter(pushed_at__isnull=True).exists())
+
+    def test_failed_send_returns_rows_to_outbox(self):
+        layer = mock.Mock(group_send=mock.AsyncMock(side_effect=OSError))
+        with mock.patch('notifications.utils.get_channel_layer', return_value=layer):
+            with self.assertRaises(OSError):
+                dispatch_pending_notifications()
+        self.assertEqual(Notification.objects.filter(pushed_at__isnull=True).count(), 2)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class UnreadCounterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+
+    def notify(self, count):
+        with mock.patch('notifications.utils.schedule_outbox_dispatch'):
+            send_bulk_realtime_notifications([(self.user, 'mention', 'تگ', 'تگ شدید', None)] * count)
+
+    def test_counter_created_from_existing_rows(self):
+        Notification.objects.bulk_create([
+            Notification(user=self.user, type='mention', title='t', message='m') for _ in range(2)
+        ])
+        self.notify(3)
+        self.assertEqual(NotificationCounter.objects.get(user=self.user).unread, 5)
+        decrement_unread(self.user.pk, 4)
+        self.assertEqual(get_unread_count(self.user.pk), 1)
+
+    def test_counter_created_concurrently_keeps_increment(self):
+        notifications = Notification.objects.bulk_create([
+            Notification(user=self.user, type='mention', title='t', message='m') for _ in range(2)
+        ])
+        # transaction دیگری بین بررسی و insert شمارنده را ساخته است
+        real_bulk_create = NotificationCounter.objects.bulk_create
+
+        def bulk_create(objs, **kwargs):
+            NotificationCounter.objects.create(user=self.user, unread=4)
+            return real_bulk_create(objs, **kwargs)
+
+        with mock.patch.object(NotificationCounter.objects, 'bulk_create', side_effect=bulk_create):
+            increment_unread(notifications)
+        self.assertEqual(get_unread_count(self.user.pk), 6)
+
+    def test_read_endpoints_keep_counter_in_sync(self):
+        self.notify(3)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        first = Notification.objects.filter(user=self.user).earliest('id')
+        self.assertEqual(client.post(f'/api/notifications/{first.pk}/read/').data, {'unread': 2})
+        # خواندن دوباره شمارنده را دوباره کم نمی‌کند
+        self.assertEqual(client.post(f'/api/notifications/{first.pk}/read/').data, {'unread': 2})
+        self.assertEqual(client.post('/api/notifications/read-all/').data, {'marked': 2, 'unread': 0})
+        self.assertEqual(client.get('/api/notifications/unread-count/').data, {'unread': 0})
+
+    def test_inbox_pages_newest_first(self):
+        self.notify(5)
+        Notification.objects.filter(pk=Notification.objects.earliest('id').pk).update(is_read=True)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ids, url = [], '/api/notifications/?page_size=2&unread=true'
+        while url:
+            response = client.get(url)
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        expected = Notification.objects.filter(is_read=False).order_by('-created', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+        self.assertEqual(len(ids), 4)
+
+
+class FrameProtocolTests(TestCase):
+
+    def test_first_supported_subprotocol_is_chosen(self):
+        self.assertEqual(negotiate(['v2.example', DEFLATE_JSON, JSON]), DEFLATE_JSON)
+        self.assertIsNone(negotiate(['v2.example']))
+        self.assertIsNone(negotiate(None))
+
+    def test_json_is_the_default(self):
+        frame = get_encoder(None).encode({'type': 'welcome', 'last_id': 3})
+        self.assertEqual(json.loads(frame['text_data']), {'type': 'welcome', 'last_id': 3})
+
+    def test_deflate_frames_share_one_context(self):
+        encoder = get_encoder(DEFLATE_JSON)
+        # کلاینت یک inflater برای کل اتصال دارد
+        inflater = zlib.decompressobj(wbits=-15)
+        events = [{'type': 'assignment', 'id': i, 'message': 'وظیفه‌ی جدید'} for i in range(3)]
+        frames = [encoder.encode(event)['bytes_data'] for event in events]
+        self.assertEqual([json.loads(inflater.decompress(frame)) for frame in frames], events)
+        # فریم‌های بعدی از کلیدهای تکراری فریم اول استفاده می‌کنند
+        self.assertLess(len(frames[2]), len(frames[0]))
+
+    @skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_frames(self):
+        frame = get_encoder(MSGPACK).encode({'type': 'gap', 'dropped': 2, 'last_id': 7})
+        self.assertEqual(msgpack.unpackb(frame['bytes_data']), {'type': 'gap', 'dropped': 2, 'last_id': 7})
+
+
+@override_settings(**LOCAL_SETTINGS)
+class FrameBatchingTests(TestCase):
+
+    async def test_events_of_one_window_share_a_compressed_frame(self):
+        communicator = WebsocketCommunicator(
+            NotificationConsumer.as_asgi(), '/ws/notifications/?batch=1', subprotocols=[DEFLATE_JSON]
+        )
+        communicator.scope['user'] = AnonymousUser()
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, DEFLATE_JSON)
+        inflater = zlib.decompressobj(wbits=-15)
+        welcome = json.loads(inflater.decompress(await communicator.receive_from()))
+        self.assertEqual([event['type'] for event in welcome['events']], ['welcome'])
+
+        layer = get_channel_layer()
+        for task_id in (1, 2, 3):
+            await layer.group_send('anonymous', {
+                'type': 'team.event', 'content': {'type': 'task.deleted', 'task': task_id, 'team': 1},
+            })
+        frame = json.loads(inflater.decompress(await communicator.receive_from()))
+        self.assertEqual(frame['type'], 'batch')
+        self.assertEqual([event['task'] for event in frame['events']], [1, 2, 3])
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+@override_settings(**LOCAL_SETTINGS)
+class ReplayTests(TransactionTestCase):
+    # consumer دیتابیس را از thread دیگری می‌خواند؛ ردیف‌ها باید commit شده باشند
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        self.notifications = [
+            Notification.objects.create(user=self.user, type='mention', title='t', message=str(i))
+            for i in range(3)
+        ]
+
+    async def connect(self, query):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), f'/ws/notifications/?{query}')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'welcome')
+        return communicator
+
+    async def receive_all(self, communicator):
+        frames = []
+        while not await communicator.receive_nothing(timeout=0.2):
+            frames.append(await communicator.receive_json_from())
+        await communicator.disconnect()
+        return frames
+
+    async def test_notification_sent_during_replay_is_delivered_once(self):
+        first, second, third = self.notifications
+        live = {**notification_payload(third)}
+        newer = {**live, 'id': third.id + 100}
+        fetch_missed = NotificationConsumer.__dict__['fetch_missed']
+
+        async def fetch_during_live_send(consumer, after_id, limit):
+            # dispatcher همزمان با بازپخش همان نوتیفیکیشن و یک نوتیفیکیشن تازه‌تر را از گروه می‌فرستد
+            layer = get_channel_layer()
+            for content in (live, newer):
+                await layer.group_send(f'user_{self.user.id}', {'type': 'send_notification', 'content': content})
+            return await fetch_missed.__get__(consumer, NotificationConsumer)(after_id, limit)
+
+        with mock.patch.object(NotificationConsumer, 'fetch_missed', fetch_during_live_send):
+            communicator = await self.connect(f'last_id={first.id}')
+            frames = await self.receive_all(communicator)
+        self.assertEqual(
+            [(frame['type'], frame.get('id', frame.get('last_id'))) for frame in frames],
+            [('mention', second.id), ('mention', third.id), ('replay_complete', third.id), ('mention', newer['id'])],
+        )
+
+    async def test_replay_is_bounded(self):
+        with mock.patch.object(NotificationConsumer, 'replay_batch_size', 1), \
+                mock.patch.object(NotificationConsumer, 'replay_limit', 2):
+            communicator = await self.connect('last_id=0')
+            frames = await self.receive_all(communicator)
+        self.assertEqual([frame.get('id') for frame in frames[:2]], [n.id for n in self.notifications[:2]])
+        self.assertEqual(frames[2], {'type': 'replay_complete', 'last_id': self.notifications[1].id, 'truncated': True})
+
+    async def test_without_valid_last_id_nothing_is_replayed(self):
+        for query in ('', 'last_id=abc'):
+            communicator = await self.connect(query)
+            self.assertEqual(await self.receive_all(communicator), [])
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TeamGroupTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.other_team = Team.objects.create(name='other')
+        self.team.members.add(self.user)
+
+    async def wait_for_groups(self, layer, channel_name, groups):
+        # teams_changed در صف همان channel پردازش می‌شود
+        for _ in range(100):
+            joined = {
+                group for group in (f'team_{self.team.pk}', f'team_{self.other_team.pk}')
+                if channel_name in layer.groups.get(group, {})
+            }
+            if joined == groups:
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f"{channel_name} is in {joined}, expected {groups}")
+
+    async def test_socket_follows_membership_changes(self):
+        layer = get_channel_layer()
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = self.user
+        await communicator.connect()
+        await communicator.receive_json_from()
+        channel_name = next(iter(layer.groups[f'user_{self.user.pk}']))
+        await self.wait_for_groups(layer, channel_name, {f'team_{self.team.pk}'})
+
+        await sync_to_async(self.other_team.members.add)(self.user)
+        await self.wait_for_groups(layer, channel_name, {f'team_{self.team.pk}', f'team_{self.other_team.pk}'})
+        event = {'type': 'task.deleted', 'task': 1, 'team': self.other_team.pk}
+        await layer.group_send(f'team_{self.other_team.pk}', {'type': 'team_event', 'content': event})
+        self.assertEqual(await communicator.receive_json_from(), event)
+
+        await sync_to_async(self.team.members.remove)(self.user)
+        await self.wait_for_groups(layer, channel_name, {f'team_{self.other_team.pk}'})
+        await layer.group_send(f'team_{self.team.pk}', {'type': 'team_event', 'content': event})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    def test_offline_users_are_not_notified(self):
+        layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch('notifications.utils.get_channel_layer', return_value=layer), \
+                mock.patch('notifications.utils.get_presence', return_value=mock.Mock(online=mock.AsyncMock(return_value={2}))):
+            notify_membership_changed([1, 2])
+        layer.group_send.assert_awaited_once_with('user_2', {'type': 'teams_changed'})
+
+
+@override_settings(**LOCAL_SETTINGS)
+class BulkNotificationTests(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{index}') for index in range(30)]
+        patcher = mock.patch('notifications.utils.get_presence', return_value=BasePresence())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def notify(self, users):
+        with mock.patch('notifications.utils.schedule_outbox_dispatch'):
+            send_bulk_realtime_notifications([(user, 'mention', 'تگ', 'تگ شدید', None) for user in users])
+
+    def test_insert_query_count_does_not_grow_with_recipients(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.notify(self.users[:3])
+        with self.assertNumQueries(len(queries)):
+            self.notify(self.users)
+
+    def test_channel_layer_sends_are_pipelined(self):
+        self.notify(self.users)
+        started = []
+        all_started = asyncio.Event()
+
+        async def group_send(group, message):
+            # اگر ارسال‌ها پشت سر هم بودند، اولین group_send هیچ‌وقت تمام نمی‌شد
+            started.append(group)
+            if len(started) == len(self.users):
+                all_started.set()
+            await asyncio.wait_for(all_started.wait(), 1)
+
+        layer = mock.Mock(group_send=mock.AsyncMock(side_effect=group_send))
+        with mock.patch('notifications.utils.get_channel_layer', return_value=layer), \
+                mock.patch('notifications.utils.async_to_sync', wraps=async_to_sync) as hop:
+            self.assertEqual(dispatch_pending_notifications(), 30)
+        self.assertEqual(layer.group_send.await_count, 30)
+        self.assertEqual(sorted(started), sorted(f'user_{user.pk}' for user in self.users))
+        # یک رفت‌وبرگشت به event loop برای کل batch
+        self.assertEqual(hop.call_count, 1)
@@ -1,30 +1,199 @@
+import asyncio
+import time
+from datetime import timedelta
+
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .coalescing import aggregate, hold, schedule_flush
+from .counters import increment_unread
+from .metrics import group_kind, group_send_duration, sends_skipped_offline_total
 from .models import Notification
+from .presence import get_presence
+
+
+def notification_payload(notif):
+    """شکل پیام WebSocket یک نوتیفیکیشن (ارسال زنده و بازپخش یکسان است)"""
+    return {
+        "id": notif.id,
+        "type": notif.type,
+        "title": notif.title,
+        "message": notif.message,
+        "task": notif.task_id,
+        "created": notif.created.isoformat(),
+    }
+
 
 def send_realtime_notification(user, type_, title, message, task=None):
     """هم ذخیره در DB و هم ارسال WebSocket"""
-    # ذخیره در دیتابیس
-    notif = Notification.objects.create(
-        user=user,
-        type=type_,
-        title=title,
-        message=message,
-        task=task
-    )
-
-    # ارسال بلادرنگ
+    return send_bulk_realtime_notifications([(user, type_, title, message, task)])[0]
+
+
+def send_bulk_realtime_notifications(items, coalesced=True):
+    """
+    نسخه‌ی گروهی send_realtime_notification.
+    items: لیستی از (user, type_, title, message, task) که user و task می‌توانند شیء مدل یا id آن باشند.
+    همه‌ی ردیف‌ها با یک bulk insert در transaction جاری ذخیره می‌شوند (outbox) و
+    ارسال WebSocket پس از commit توسط dispatcher انجام می‌شود؛ بنابراین درخواست
+    منتظر Redis نمی‌ماند و با rollback هم چیزی ارسال نمی‌شود.
+    ارسال زنده‌ی انواع NOTIFICATION_COALESCE_TYPES تا پایان پنجره‌ی تجمیع نگه داشته می‌شود
+    (مگر با coalesced=False).
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    with transaction.atomic():
+        notifications = _store_notifications(items, coalesced)
+        transaction.on_commit(schedule_outbox_dispatch, robust=True)
+    return notifications
+
+
+def _store_notifications(items, coalesced=True):
+    # ذخیره در دیتابیس (همراه با به‌روزرسانی شمارنده‌ی خوانده‌نشده‌ها)
+    notifications = [
+        Notification(
+            user_id=getattr(user, 'pk', user),
+            type=type_,
+            title=title,
+            message=message,
+            task_id=getattr(task, 'pk', task)
+        )
+        for user, type_, title, message, task in items
+    ]
+    held_until = hold(notifications) if coalesced else None
+    notifications = Notification.objects.bulk_create(notifications)
+    increment_unread(notifications)
+    if held_until:
+        transaction.on_commit(lambda: schedule_flush(held_until), robust=True)
+    return notifications
+
+
+def schedule_outbox_dispatch():
+    from .tasks import dispatch_notification_outbox
+    dispatch_notification_outbox.delay()
+
+
+def schedule_team_events(events):
+    """
+    رویدادهای سطح تیم (لیست (team_id, content)) در worker به گروه‌های team_<id> فرستاده می‌شوند
+    تا round trip به channel layer روی thread درخواست نباشد. این رویدادها ذخیره نمی‌شوند؛
+    اگر از دست بروند کلاینت با sync تسک‌ها به‌روز می‌شود.
+    """
+    from .tasks import broadcast_team_events_task
+    broadcast_team_events_task.delay(events)
+
+
+def dispatch_pending_notifications(batch_size=None):
+    """
+    ردیف‌های ارسال‌نشده‌ی outbox را به ترتیب id و به صورت batch به channel layer می‌فرستد.
+    هر batch ابتدا در یک transaction کوتاه با پر کردن pushed_at برداشته و commit می‌شود و
+    group_send بعد از آن و بدون قفل ردیف‌ها انجام می‌شود. اگر ارسال خطا بدهد pushed_at
+    ردیف‌ها دوباره خالی می‌شود تا اجرای بعدی آن‌ها را بفرستد (at-least-once؛ کلاینت با id
+    تکراری‌ها را کنار می‌گذارد). اگر worker بین برداشتن و ارسال از کار بیفتد، ارسال زنده‌ی
+    آن batch انجام نمی‌شود و کلاینت نوتیفیکیشن را از بازپخش یا صندوق پیام می‌گیرد.
+    ردیف‌های قدیمی‌تر از NOTIFICATION_OUTBOX_MAX_AGE و ردیف‌های کاربران آفلاین (presence)
+    فقط علامت می‌خورند؛ کلاینت آن‌ها را هنگام اتصال مجدد از بازپخش یا صندوق پیام می‌گیرد.
+    ردیف‌های تجمیعی تا پایان پنجره‌شان (held_until) رد می‌شوند.
+    """
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 500)
+    max_age = timedelta(seconds=getattr(settings, 'NOTIFICATION_OUTBOX_MAX_AGE', 3600))
     channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(
-        f"user_{user.id}",
-        {
-            "type": "send_notification",
-            "content": {
-                "type": type_,
-                "title": title,
-                "message": message,
+    pending = Notification.objects.filter(
+        Q(held_until__isnull=True) | Q(held_until__lte=timezone.now()), pushed_at__isnull=True
+    ).order_by('id')
+
+    pushed = 0
+    while True:
+        with transaction.atomic():
+            # چند dispatcher همزمان ردیف‌های قفل‌شده‌ی یکدیگر را رد می‌کنند
+            batch = list(pending.select_for_update(skip_locked=True)[:batch_size])
+            if not batch:
+                break
+            now = timezone.now()
+            Notification.objects.filter(id__in=[notif.id for notif in batch]).update(pushed_at=now)
+
+        fresh = [notif for notif in batch if notif.created >= now - max_age]
+        try:
+            sent = async_to_sync(_send_to_online)(channel_layer, fresh)
+        except Exception:
+            Notification.objects.filter(id__in=[notif.id for notif in fresh]).update(pushed_at=None)
+            raise
+        pushed += sent
+        if len(batch) < batch_size:
+            break
+    return pushed
+
+
+async def _send_to_online(channel_layer, notifications):
+    """بررسی گروهی presence و group_send فقط برای کاربران آنلاین؛ خروجی تعداد ارسال‌هاست"""
+    if not notifications:
+        return 0
+    online = await get_presence().online(channel_layer, {notif.user_id for notif in notifications})
+    live = [notif for notif in notifications if notif.user_id in online]
+    if len(live) < len(notifications):
+        sends_skipped_offline_total.inc(len(notifications) - len(live))
+    # زمان group_send اینجا ثبت نمی‌شود: این مسیر در worker Celery اجرا می‌شود که /metrics ندارد
+    await asyncio.gather(*(
+        channel_layer.group_send(group, message) for group, message in _notification_messages(live)
+    ))
+    return len(live)
+
+
+def _notification_messages(notifications):
+    # ردیف‌های تجمیعی هر (کاربر، نوع) یک پیام می‌شوند
+    payloads, held = [], {}
+    for notif in notifications:
+        if notif.held_until is None:
+            payloads.append((notif.user_id, notification_payload(notif)))
+        else:
+            held.setdefault((notif.user_id, notif.type), []).append(notification_payload(notif))
+    payloads.extend((user_id, aggregate(type_, group)) for (user_id, type_), group in held.items())
+    return [
+        (
+            f"user_{user_id}",
+            {
+                "type": "send_notification",
+                "content": payload
             }
-        }
-    )
+        )
+        for user_id, payload in sorted(payloads, key=lambda item: item[1]['id'])
+    ]
+
+
+async def _group_send_many(channel_layer, messages):
+    await asyncio.gather(*(
+        _timed_group_send(channel_layer, group, message) for group, message in messages
+    ))
+
+
+async def _timed_group_send(channel_layer, group, message):
+    start = time.perf_counter()
+    await channel_layer.group_send(group, message)
+    group_send_duration.observe(time.perf_counter() - start, group=group_kind(group))
+
+
+def broadcast_team_events(events):
+    """
+    ارسال رویدادها به اعضای آنلاین تیم‌ها با یک group_send روی team_<id> برای هر رویداد
+    (به جای یک ارسال برای هر عضو). events لیستی از (team_id, content) است و ذخیره نمی‌شود.
+    """
+    channel_layer = get_channel_layer()
+    async_to_sync(_group_send_many)(channel_layer, [
+        (f"team_{team_id}", {"type": "team_event", "content": content})
+        for team_id, content in events
+    ])
+
+
+def notify_membership_changed(user_ids):
+    """به اتصال‌های کاربران خبر می‌دهد که گروه‌های team_<id> خود را دوباره همگام کنند"""
+    async_to_sync(_notify_online)(get_channel_layer(), list(user_ids), {"type": "teams_changed"})
+
 
-    return notif
+async def _notify_online(channel_layer, user_ids, message):
+    # اتصال‌های بعدی گروه‌ها را هنگام connect می‌سازند؛ فقط کاربران آنلاین لازم است خبردار شوند
+    online = await get_presence().online(channel_layer, user_ids)
+    await _group_send_many(channel_layer, [(f"user_{user_id}", message) for user_id in user_ids if user_id in online])
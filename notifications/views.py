@@ -1,3 +1,117 @@
-from django.shortcuts import render
+from django.db import transaction
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status, permissions
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter
+from tasks.pagination import KeysetPagination
+from .counters import decrement_unread, get_unread_count
+from .models import Notification
+from .serializers import NotificationSerializer, UnreadCountSerializer, MarkAllReadResponseSerializer
 
-# Create your views here.
+
+class NotificationPagination(KeysetPagination):
+    ordering = ('-created', '-id')
+
+
+class NotificationListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        responses={200: NotificationSerializer(many=True)},
+        summary="صندوق نوتیفیکیشن‌های کاربر",
+        description=(
+            "نوتیفیکیشن‌های کاربر از جدید به قدیم و به صورت صفحه‌بندی‌شده (cursor) برگردانده می‌شود.\n"
+            "با unread=true فقط خوانده‌نشده‌ها برگردانده می‌شوند."
+        ),
+        tags=['Notifications'],
+        parameters=[
+            OpenApiParameter('cursor', str, description="کرسر صفحه‌ی بعد"),
+            OpenApiParameter('page_size', int, description="اندازه‌ی صفحه"),
+            OpenApiParameter('unread', bool, description="فقط خوانده‌نشده‌ها"),
+        ],
+        examples=[
+            OpenApiExample(
+                "نمونه پاسخ صندوق",
+                value={
+                    "next": "http://localhost:8000/api/notifications/?cursor=WyIyMDI1LTExLTA1VDA5OjAwOjAwIiw0Ml0",
+                    "results": [
+                        {
+                            "id": 43,
+                            "type": "mention",
+                            "title": "تگ شدن در وظیفه",
+                            "message": "arash شما را در وظیفه 'رفع باگ لاگین' تگ کرد.",
+                            "task": 1,
+                            "is_read": False,
+                            "created": "2025-11-05T09:00:00+03:30"
+                        }
+                    ]
+                },
+                response_only=True
+            )
+        ]
+    )
+    def get(self, request):
+        notifications = Notification.objects.filter(user=request.user)
+        if request.query_params.get('unread') in ('1', 'true', 'True'):
+            notifications = notifications.filter(is_read=False)
+        paginator = NotificationPagination()
+        page = paginator.paginate_queryset(notifications, request, view=self)
+        serializer = NotificationSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class UnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        responses={200: UnreadCountSerializer},
+        summary="تعداد نوتیفیکیشن‌های خوانده‌نشده",
+        description="مقدار از شمارنده‌ی نگهداری‌شده خوانده می‌شود (بدون شمارش تاریخچه).",
+        tags=['Notifications'],
+        examples=[
+            OpenApiExample("نمونه پاسخ", value={"unread": 3}, response_only=True)
+        ]
+    )
+    def get(self, request):
+        return Response({"unread": get_unread_count(request.user.id)})
+
+
+class NotificationReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={200: UnreadCountSerializer},
+        summary="علامت‌گذاری یک نوتیفیکیشن به عنوان خوانده‌شده",
+        tags=['Notifications'],
+        examples=[
+            OpenApiExample("نمونه پاسخ", value={"unread": 2}, response_only=True)
+        ]
+    )
+    def post(self, request, pk):
+        notifications = Notification.objects.filter(pk=pk, user=request.user)
+        with transaction.atomic():
+            updated = notifications.filter(is_read=False).update(is_read=True)
+            decrement_unread(request.user.id, updated)
+        if not updated and not notifications.exists():
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"unread": get_unread_count(request.user.id)})
+
+
+class NotificationReadAllView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        request=None,
+        responses={200: MarkAllReadResponseSerializer},
+        summary="علامت‌گذاری همه‌ی نوتیفیکیشن‌ها به عنوان خوانده‌شده",
+        tags=['Notifications'],
+        examples=[
+            OpenApiExample("نمونه پاسخ", value={"marked": 5, "unread": 0}, response_only=True)
+        ]
+    )
+    def post(self, request):
+        with transaction.atomic():
+            marked = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+            decrement_unread(request.user.id, marked)
+        return Response({"marked": marked, "unread": get_unread_count(request.user.id)})
@@ -0,0 +1,235 @@
+"""
+نسخه‌ی async endpointهای تسک برای اجرا روی daphne بدون thread hop برای هر درخواست.
+احراز هویت از token_cache، عضویت از کش تیم‌ها و دسترسی به دیتابیس با ORM async انجام می‌شود
+و نوتیفیکیشن‌ها مثل viewهای sync در outbox نوشته و بعد از commit ارسال می‌شوند.
+ORM async هر عبارت را جدا commit می‌کند؛ پس هر بلوک نوشتن یک تابع sync در
+transaction.atomic است که با sync_to_async اجرا می‌شود.
+قواعد و شکل پاسخ‌ها با tasks/views.py یکسان است.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from auth_api.authentication import aload_token
+from notifications.utils import send_bulk_realtime_notifications
+from teams.cache import aget_user_team_ids
+from .mentions import aresolve_mentions, parse_mentions
+from .filters import filter_tasks
+from .fragments import aget_task_fragments, task_read_queryset
+from .messages import assignment_notification, mention_notifications
+from .models import Task
+from .pagination import TaskPagination
+from .serializers import AsyncTaskInputSerializer, TaskMentionRequestSerializer, TaskSerializer
+
+
+PERMISSION_DENIED = {"detail": "You do not have permission to perform this action."}
+
+
+class AsyncAPIView(View):
+    """پایه‌ی viewهای async: احراز هویت Token، پارس بدنه‌ی JSON و خطاهای DRF"""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or handler is None:
+            return HttpResponseNotAllowed(self._allowed_methods())
+
+        request.user = await self.authenticate(request)
+        if request.user is None:
+            return self.respond(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            self.data = json.loads(request.body) if request.body else {}
+        except ValueError:
+            return self.respond({"detail": "JSON parse error."}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(self.data, dict):
+            return self.respond({"detail": "Expected a JSON object."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return await handler(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+            return self.respond(detail, status=exc.status_code)
+
+    async def authenticate(self, request):
+        parts = request.headers.get('Authorization', '').split()
+        if len(parts) != 2 or parts[0].lower() != 'token':
+            return None
+        value = await aload_token(parts[1])
+        if value is None or not value[0].is_active:
+            return None
+        return value[0]
+
+    async def is_member(self, user, team_id):
+        return team_id in await aget_user_team_ids(user.id)
+
+    def respond(self, data, status=status.HTTP_200_OK):
+        return JsonResponse(data, status=status, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+class AsyncTaskObjectMixin:
+    task_queryset = Task.objects.all()
+
+    async def get_task(self):
+        if not hasattr(self, '_task'):
+            self._task = await self.task_queryset.filter(pk=self.kwargs['pk']).afirst()
+        return self._task
+
+
+class AsyncTaskListView(AsyncAPIView):
+
+    async def get(self, request):
+        team_ids = await aget_user_team_ids(request.user.id)
+        tasks = filter_tasks(Task.objects.filter(team_id__in=team_ids), request).only('id', 'due_date', 'priority')
+        paginator = TaskPagination()
+        page = await paginator.apaginate_queryset(tasks, request, view=self)
+        data = await aget_task_fragments(task.id for task in page)
+        return self.respond(paginator.get_paginated_data(data))
+
+
+class AsyncTaskDetailView(AsyncTaskObjectMixin, AsyncAPIView):
+
+    task_queryset = Task.objects.only('id', 'team_id')
+
+    async def get(self, request, pk):
+        task = await self.get_task()
+        if not task or not await self.is_member(request.user, task.team_id):
+            return self.respond(PERMISSION_DENIED, status=status.HTTP_403_FORBIDDEN)
+        data = await aget_task_fragments([task.pk])
+        if not data:
+            return self.respond({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return self.respond(data[0])
+
+
+class AsyncTaskCreateView(AsyncAPIView):
+
+    async def post(self, request):
+        serializer = AsyncTaskInputSerializer(data=self.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        team_id = data.pop('team')
+        assignee_id = data.pop('assignee', None)
+        tagged_ids = data.pop('tagged_users', [])
+
+        if not await self.is_member(request.user, team_id):
+            return self.respond(PERMISSION_DENIED, status=status.HTTP_403_FORBIDDEN)
+
+        # وجود همه‌ی کاربران ارجاع‌شده با یک کوئری
+        referenced = set(tagged_ids) | ({assignee_id} if assignee_id else set())
+        found = {
+            user_id async for user_id in
+            User.objects.filter(id__in=referenced).values_list('id', flat=True)
+        }
+        errors = {}
+        if assignee_id and assignee_id not in found:
+            errors['assignee'] = [f'Invalid pk "{assignee_id}" - object does not exist.']
+        missing = [user_id for user_id in tagged_ids if user_id not in found]
+        if missing:
+            errors['tagged_users'] = [f'Invalid pk "{missing[0]}" - object does not exist.']
+        if errors:
+            raise ValidationError(errors)
+
+        # استخراج @mention ها (فقط اعضای تیم)
+        mentioned = await aresolve_mentions(team_id, data.get('description'))
+        mentioned_ids = [user_id for user_id, _ in mentioned]
+
+        task = await sync_to_async(self.create_task)(
+            request.user, team_id, assignee_id, data, list(dict.fromkeys(tagged_ids + mentioned_ids)), mentioned_ids
+        )
+        task = await task_read_queryset().aget(pk=task.pk)
+        return self.respond(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
+
+    def create_task(self, user, team_id, assignee_id, data, tagged_ids, mentioned_ids):
+        with transaction.atomic():
+            task = Task.objects.create(creator=user, team_id=team_id, assignee_id=assignee_id, **data)
+            if tagged_ids:
+                task.tagged_users.add(*tagged_ids)
+            notifications = []
+            if assignee_id:
+                notifications.append(assignment_notification(task, assignee_id))
+            notifications.extend(mention_notifications(task, user, mentioned_ids))
+            send_bulk_realtime_notifications(notifications)
+        return task
+
+
+class AsyncTaskAssignView(AsyncTaskObjectMixin, AsyncAPIView):
+
+    async def post(self, request, pk):
+        task = await self.get_task()
+        if not task or not await self.is_member(request.user, task.team_id):
+            return self.respond(PERMISSION_DENIED, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            assignee_id = int(self.data.get("assignee_id") or 0)
+        except (TypeError, ValueError):
+            assignee_id = 0
+        if not assignee_id:
+            return self.respond({"detail": "assignee_id is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        assignee = await User.objects.filter(id=assignee_id).afirst()
+        if assignee is None:
+            return self.respond({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # بررسی اینکه assignee عضو همان تیم است
+        if not await self.is_member(assignee, task.team_id):
+            return self.respond({"detail": "User is not a member of this team."}, status=status.HTTP_403_FORBIDDEN)
+
+        await sync_to_async(self.assign_task)(task, assignee)
+
+        return self.respond({
+            "message": "Task assigned successfully.",
+            "assigned_to": {"id": assignee.id, "username": assignee.username},
+            "task": task.title
+        })
+
+    def assign_task(self, task, assignee):
+        with transaction.atomic():
+            task.assignee = assignee
+            task.save()
+            send_bulk_realtime_notifications([assignment_notification(task, assignee)])
+
+
+class AsyncTaskMentionView(AsyncTaskObjectMixin, AsyncAPIView):
+
+    async def post(self, request, pk):
+        task = await self.get_task()
+        if not task or not await self.is_member(request.user, task.team_id):
+            return self.respond(PERMISSION_DENIED, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = TaskMentionRequestSerializer(data=self.data)
+        serializer.is_valid(raise_exception=True)
+        description = serializer.validated_data["description"]
+
+        if not parse_mentions(description):
+            return self.respond({"detail": "No usernames mentioned."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # فقط اعضای تیم مجازند
+        mentioned = await aresolve_mentions(task.team_id, description)
+        mentioned_ids = [user_id for user_id, _ in mentioned]
+        await sync_to_async(self.tag_users)(task, request.user, description, mentioned_ids)
+
+        return self.respond({
+            "message": "Users tagged successfully.",
+            "tagged_users": [{"id": user_id, "username": username} for user_id, username in mentioned]
+        })
+
+    def tag_users(self, task, user, description, mentioned_ids):
+        with transaction.atomic():
+            if mentioned_ids:
+                task.tagged_users.add(*mentioned_ids)
+            task.description = description
+            task.save()
+            send_bulk_realtime_notifications(mention_notifications(task, user, mentioned_ids))
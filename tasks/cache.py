@@ -0,0 +1,19 @@
+def task_version_key(task_id):
+    # نسخه‌ی نمایش یک تسک برای ETag جزئیات تسک
+    return f"task:{task_id}:version"
+
+
+def team_tasks_version_key(team_id):
+    # نسخه‌ی مجموعه‌ی تسک‌های یک تیم برای ETag لیست تسک‌ها
+    return f"team:{team_id}:tasks_version"
+
+
+def task_version_keys(task_ids, team_ids):
+    return [task_version_key(task_id) for task_id in task_ids] + [
+        team_tasks_version_key(team_id) for team_id in team_ids
+    ]
+
+
+def task_fragment_key(task_id, version):
+    # نمایش سریال‌شده‌ی تسک برای یک نسخه؛ با عوض شدن نسخه کلید قبلی دیگر خوانده نمی‌شود
+    return f"task:{task_id}:fragment:{version}"
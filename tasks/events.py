@@ -0,0 +1,97 @@
+"""
+رویدادهای چرخه‌ی عمر تسک برای اعضای آنلاین تیم (گروه team_<id> در NotificationConsumer).
+به جای کل خروجی TaskSerializer فقط فیلدهای تغییرکرده ارسال می‌شوند تا کلاینت
+وضعیت محلی را بدون درخواست دوباره به‌روز کند:
+
+    {"type": "task.updated", "task": 12, "team": 3, "changes": {"title": "...", "priority": "high"}}
+
+انواع: task.created، task.updated، task.reassigned (تغییر assignee)، task.tags و task.deleted.
+مقدار قبلی فیلدها هنگام خواندن از دیتابیس (Task.from_db) نگه داشته می‌شود و
+رویدادها فقط بعد از commit و از worker Celery ارسال می‌شوند.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.utils import schedule_team_events
+from .models import PRIORITY_NAMES, Task
+
+
+# attname فیلدهایی که در diff می‌آیند -> نام همان فیلد در API
+TRACKED_FIELDS = {
+    'title': 'title',
+    'description': 'description',
+    'due_date': 'due_date',
+    'priority': 'priority',
+    'assignee_id': 'assignee',
+}
+
+
+def snapshot(task):
+    # فیلدهای defer شده در __dict__ نیستند و نادیده گرفته می‌شوند
+    return {name: task.__dict__[name] for name in TRACKED_FIELDS if name in task.__dict__}
+
+
+def _api_value(name, value):
+    if value is None:
+        return None
+    if name == 'due_date':
+        # ممکن است رشته یا datetime بدون منطقه‌ی زمانی به مدل داده شده باشد (مثل save دیتابیس
+        # نرمال می‌شود)؛ خروجی هم‌شکل TaskSerializer در منطقه‌ی زمانی پروژه است
+        value = Task._meta.get_field('due_date').to_python(value)
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return timezone.localtime(value).isoformat()
+    if name == 'priority':
+        return PRIORITY_NAMES.get(value, value)
+    return value
+
+
+def task_changes(task, created=False, update_fields=None):
+    """فیلدهای تغییرکرده نسبت به آخرین snapshot با نام و شکل API"""
+    old = {} if created else getattr(task, '_loaded_values', {})
+    fields = None if update_fields is None else {TRACKED_FIELDS.get(name, name) for name in update_fields}
+    changes = {}
+    for name, value in snapshot(task).items():
+        api_name = TRACKED_FIELDS[name]
+        if fields is not None and api_name not in fields and name not in fields:
+            continue
+        if name in old and old[name] == value:
+            continue
+        changes[api_name] = _api_value(name, value)
+    return changes
+
+
+def saved_event(task, created=False, update_fields=None):
+    changes = task_changes(task, created, update_fields)
+    # تغییرات بعدی همین نمونه نسبت به وضعیت ذخیره‌شده سنجیده می‌شوند
+    task._loaded_values = snapshot(task)
+    if created:
+        changes['creator'] = task.creator_id
+        return {'type': 'task.created', 'task': task.pk, 'team': task.team_id, 'changes': changes}
+    if not changes:
+        return None
+    event_type = 'task.reassigned' if 'assignee' in changes else 'task.updated'
+    return {'type': event_type, 'task': task.pk, 'team': task.team_id, 'changes': changes}
+
+
+def deleted_event(task_id, team_id):
+    return {'type': 'task.deleted', 'task': task_id, 'team': team_id}
+
+
+def tags_event(task_id, team_id, added=(), removed=()):
+    return {
+        'type': 'task.tags', 'task': task_id, 'team': team_id,
+        'added': sorted(added), 'removed': sorted(removed),
+    }
+
+
+def publish_task_events(events):
+    """
+    رویدادها پس از commit (با rollback چیزی ارسال نمی‌شود) به Celery سپرده می‌شوند؛
+    درخواست منتظر channel layer نمی‌ماند.
+    """
+    events = [event for event in events if event]
+    if events:
+        transaction.on_commit(
+            lambda: schedule_team_events([(event['team'], event) for event in events]), robust=True
+        )
@@ -0,0 +1,63 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .serializers import PriorityField
+
+
+def _query_params(request):
+    # Request در DRF و HttpRequest در viewهای async
+    return getattr(request, 'query_params', request.GET)
+
+
+def _user_id(value, user, param):
+    if value == 'me':
+        return user.id
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({param: ["Expected a user id or 'me'."]})
+
+
+def _datetime(value, param):
+    try:
+        return serializers.DateTimeField().to_internal_value(value)
+    except ValidationError as exc:
+        raise ValidationError({param: exc.detail})
+
+
+def _priorities(params):
+    field = PriorityField()
+    try:
+        return sorted({field.to_internal_value(name.strip()) for name in params['priority'].split(',')})
+    except ValidationError as exc:
+        raise ValidationError({'priority': exc.detail})
+
+
+def filter_tasks(queryset, request):
+    """
+    فیلترهای لیست تسک از query string:
+    team، assignee و creator (id یا me)، priority (چند مقدار با کاما)،
+    due_after / due_before (ISO 8601) و tagged_me=true.
+    هر فیلتر با یکی از ایندکس‌های ترکیبی Task.Meta همراه با ترتیب due_date/priority پوشش داده می‌شود.
+    """
+    params = _query_params(request)
+    user = request.user
+
+    if params.get('team'):
+        try:
+            queryset = queryset.filter(team_id=int(params['team']))
+        except ValueError:
+            raise ValidationError({'team': ["Expected a team id."]})
+    if params.get('assignee'):
+        queryset = queryset.filter(assignee_id=_user_id(params['assignee'], user, 'assignee'))
+    if params.get('creator'):
+        queryset = queryset.filter(creator_id=_user_id(params['creator'], user, 'creator'))
+    if params.get('priority'):
+        queryset = queryset.filter(priority__in=_priorities(params))
+    if params.get('due_after'):
+        queryset = queryset.filter(due_date__gte=_datetime(params['due_after'], 'due_after'))
+    if params.get('due_before'):
+        queryset = queryset.filter(due_date__lt=_datetime(params['due_before'], 'due_before'))
+    if params.get('tagged_me') in ('1', 'true', 'True'):
+        queryset = queryset.filter(tagged_users=user)
+    return queryset
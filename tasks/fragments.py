@@ -0,0 +1,78 @@
+"""
+کش نمایش سریال‌شده‌ی هر تسک (fragment).
+کلید هر fragment شامل نسخه‌ی تسک (task:<id>:version) است که signals.py پس از commit
+باطلش می‌کند؛ پس fragment کهنه هیچ‌وقت با نسخه‌ی جدید خوانده نمی‌شود و
+لازم نیست جداگانه حذف شود. فقط تسک‌های miss از TaskSerializer عبور می‌کنند.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from team_tasks_realtime.conditional import aget_versions, get_versions
+from .cache import task_fragment_key, task_version_key
+from .models import Task
+from .serializers import TaskSerializer
+
+
+FRAGMENT_TIMEOUT = 60 * 60
+
+
+def task_read_queryset():
+    return Task.objects.select_related('creator', 'assignee').prefetch_related(
+        Prefetch('tagged_users', queryset=User.objects.only('id', 'username'))
+    )
+
+
+def _fragment_keys(task_ids, versions):
+    return {task_id: task_fragment_key(task_id, version) for task_id, version in zip(task_ids, versions)}
+
+
+def _serialize(tasks, keys):
+    return {task.id: dict(TaskSerializer(task).data) for task in tasks if task.id in keys}
+
+
+def _ordered(task_ids, keys, cached, fresh):
+    # تسک‌هایی که در این فاصله حذف شده‌اند کنار گذاشته می‌شوند
+    result = []
+    for task_id in task_ids:
+        data = cached.get(keys[task_id], fresh.get(task_id))
+        if data is not None:
+            result.append(data)
+    return result
+
+
+def get_task_fragments(task_ids, versions=None):
+    """نمایش سریال‌شده‌ی تسک‌ها به همان ترتیب task_ids با دو multi-get روی کش"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return []
+    if versions is None:
+        versions = get_versions(task_version_key(task_id) for task_id in task_ids)
+    keys = _fragment_keys(task_ids, versions)
+    cached = cache.get_many(keys.values())
+
+    missing = [task_id for task_id in task_ids if keys[task_id] not in cached]
+    fresh = {}
+    if missing:
+        fresh = _serialize(task_read_queryset().filter(id__in=missing), keys)
+        cache.set_many({keys[task_id]: data for task_id, data in fresh.items()}, FRAGMENT_TIMEOUT)
+    return _ordered(task_ids, keys, cached, fresh)
+
+
+async def aget_task_fragments(task_ids, versions=None):
+    """نسخه‌ی async تابع get_task_fragments"""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return []
+    if versions is None:
+        versions = await aget_versions(task_version_key(task_id) for task_id in task_ids)
+    keys = _fragment_keys(task_ids, versions)
+    cached = await cache.aget_many(keys.values())
+
+    missing = [task_id for task_id in task_ids if keys[task_id] not in cached]
+    fresh = {}
+    if missing:
+        tasks = [task async for task in task_read_queryset().filter(id__in=missing)]
+        fresh = _serialize(tasks, keys)
+        await cache.aset_many({keys[task_id]: data for task_id, data in fresh.items()}, FRAGMENT_TIMEOUT)
+    return _ordered(task_ids, keys, cached, fresh)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from tasks.models import PRIORITY_NAMES, Task
+
+
+class Command(BaseCommand):
+    help = (
+        "مقدارهای متنی priority (low/medium/high) را به عدد تبدیل می‌کند؛ باید قبل از migrate ای که "
+        "ستون را PositiveSmallIntegerField می‌کند اجرا شود. روی دیتابیس تازه یا تبدیل‌شده کاری نمی‌کند."
+    )
+
+    def handle(self, *args, **options):
+        table = Task._meta.db_table
+        column = Task._meta.get_field('priority').column
+        with connection.cursor() as cursor:
+            if table not in connection.introspection.table_names(cursor):
+                self.stdout.write("No task table yet; nothing to convert")
+                return
+            description = {
+                row.name: row for row in connection.introspection.get_table_description(cursor, table)
+            }
+        row = description[column]
+        if connection.introspection.get_field_type(row.type_code, row) not in ('CharField', 'TextField'):
+            self.stdout.write("priority is already numeric; nothing to convert")
+            return
+
+        # ستون هنوز متنی است؛ رشته‌ی عدد بعداً با ALTER COLUMN ... USING priority::smallint تبدیل می‌شود
+        quote = connection.ops.quote_name
+        converted = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for value, name in PRIORITY_NAMES.items():
+                cursor.execute(
+                    f"UPDATE {quote(table)} SET {quote(column)} = %s WHERE {quote(column)} = %s",
+                    [str(value), name]
+                )
+                converted += cursor.rowcount
+        self.stdout.write(self.style.SUCCESS(f"{converted} task(s) converted"))
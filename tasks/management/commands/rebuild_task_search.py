@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from tasks.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "ایندکس جستجوی تسک‌ها را از نو می‌سازد (مثلاً بعد از import مستقیم در دیتابیس)"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.setup()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"{type(backend).__name__}: {count} task(s) indexed"))
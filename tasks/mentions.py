@@ -0,0 +1,52 @@
+import re
+
+from teams.cache import aget_team_member_index, get_team_member_index
+
+
+MENTION_PATTERN = re.compile(r'@(\w+)')
+
+
+def parse_mentions(text):
+    """username های @mention شده به ترتیب ظهور و بدون تکرار"""
+    if not text:
+        return []
+    return list(dict.fromkeys(MENTION_PATTERN.findall(text)))
+
+
+def resolve_mentions(team_id, text):
+    """
+    @mention های متن را فقط بین اعضای تیم پیدا می‌کند.
+    خروجی لیستی از (user_id, username) است؛ نام‌های ناشناس یا غیرعضو کنار گذاشته می‌شوند.
+    مستقل از تعداد نام‌ها، حداکثر یک lookup (کش یا یک کوئری) انجام می‌شود.
+    """
+    usernames = parse_mentions(text)
+    if not usernames:
+        return []
+    index = get_team_member_index(team_id)
+    return [(index[username], username) for username in usernames if username in index]
+
+
+def resolve_mentions_bulk(items):
+    """
+    نسخه‌ی گروهی resolve_mentions برای لیستی از (team_id, text).
+    ایندکس اعضای هر تیم فقط یک بار خوانده می‌شود؛ خروجی به ترتیب items است.
+    """
+    items = list(items)
+    indexes = {}
+    result = []
+    for team_id, text in items:
+        usernames = parse_mentions(text)
+        if usernames and team_id not in indexes:
+            indexes[team_id] = get_team_member_index(team_id)
+        index = indexes.get(team_id, {})
+        result.append([(index[username], username) for username in usernames if username in index])
+    return result
+
+
+async def aresolve_mentions(team_id, text):
+    """نسخه‌ی async تابع resolve_mentions"""
+    usernames = parse_mentions(text)
+    if not usernames:
+        return []
+    index = await aget_team_member_index(team_id)
+    return [(index[username], username) for username in usernames if username in index]
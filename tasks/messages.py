@@ -0,0 +1,11 @@
+"""متن نوتیفیکیشن‌های تسک؛ بین viewهای sync و async مشترک است"""
+
+
+def assignment_notification(task, assignee):
+    message = f"وظیفه '{task.title}' به شما واگذار شد."
+    return (assignee, 'assignment', 'تخصیص وظیفه جدید', message, task)
+
+
+def mention_notifications(task, actor, user_ids):
+    message = f"{actor.username} شما را در وظیفه '{task.title}' تگ کرد."
+    return [(user_id, 'mention', 'تگ شدن در وظیفه', message, task) for user_id in user_ids]
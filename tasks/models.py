@@ -1,28 +1,97 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from teams.models import Team
 
 
+# اولویت به صورت عدد ذخیره می‌شود تا مرتب‌سازی درست باشد؛ API همان نام‌ها را برمی‌گرداند
+PRIORITY_LOW = 1
+PRIORITY_MEDIUM = 2
+PRIORITY_HIGH = 3
+
 PRIORITY_CHOICES = [
-    ('low', 'Low'),
-    ('medium', 'Medium'),
-    ('high', 'High'),
+    (PRIORITY_LOW, 'Low'),
+    (PRIORITY_MEDIUM, 'Medium'),
+    (PRIORITY_HIGH, 'High'),
 ]
 
+PRIORITY_NAMES = {
+    PRIORITY_LOW: 'low',
+    PRIORITY_MEDIUM: 'medium',
+    PRIORITY_HIGH: 'high',
+}
+
 
 class Task(models.Model):
     title= models.CharField(max_length=250)
     creator=models.ForeignKey(User, related_name='created_tasks', on_delete=models.CASCADE, blank= True, null=True)
     description= models.TextField(max_length=500, blank=True, null=True)
     due_date= models.DateTimeField()
-    priority= models.CharField(max_length=10, choices=PRIORITY_CHOICES)
+    priority= models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES)
     assignee=models.ForeignKey(User, null= True, blank= True, related_name='assigned_tasks', on_delete=models.SET_NULL)
     tagged_users= models.ManyToManyField(User, related_name='tagged_in_tasks', blank= True,)
     team= models.ForeignKey(Team, related_name='tasks', on_delete=models.CASCADE)
+    # زمان ارسال نوتیفیکیشن دیرکرد؛ تا وقتی خالی است تسک در صف بررسی دیرکرد می‌ماند
+    overdue_notified_at= models.DateTimeField(null=True, blank=True, editable=False)
+
+
+    class Meta:
+        indexes = [
+            # ایندکس جزئی: فقط تسک‌هایی که هنوز بابت دیرکرد اطلاع‌رسانی نشده‌اند
+            models.Index(
+                fields=['due_date'],
+                name='task_overdue_pending_idx',
+                condition=models.Q(overdue_notified_at__isnull=True),
+            ),
+            # فیلتر و مرتب‌سازی لیست تسک‌ها (id برای کرسر keyset در انتهای ایندکس است)
+            models.Index(fields=['team', 'due_date', 'id'], name='task_team_due_idx'),
+            models.Index(fields=['team', 'priority', 'id'], name='task_team_priority_idx'),
+            models.Index(fields=['assignee', 'due_date', 'id'], name='task_assignee_due_idx'),
+            models.Index(fields=['creator', 'due_date', 'id'], name='task_creator_due_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # مقدار خوانده‌شده برای diff رویدادهای زنده (tasks/events.py)
+        from .events import snapshot
+        instance._loaded_values = snapshot(instance)
+        return instance
 
+    def save(self, *args, **kwargs):
+        # موعد جدید دوباره در صف بررسی دیرکرد قرار می‌گیرد (notifications.tasks.check_overdue_tasks)
+        loaded = getattr(self, '_loaded_values', {})
+        if self.pk and loaded.get('due_date', self.due_date) != self.due_date:
+            self.overdue_notified_at = None
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'due_date' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'overdue_notified_at'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 
-     
\ No newline at end of file
+     
+
+class TaskChange(models.Model):
+    """
+    لاگ تغییرات تسک‌ها برای sync افزایشی (tasks/sync.py).
+    id یکنواخت افزایشی همان شماره‌ی ترتیب تغییر است؛ task و team عمداً ForeignKey نیستند
+    تا ردیف حذف (deleted=True، tombstone) بعد از حذف تسک یا تیم باقی بماند.
+    ردیف‌های قدیمی‌تر از TASK_CHANGE_RETENTION توسط Celery Beat پاک می‌شوند.
+    """
+    task_id = models.BigIntegerField()
+    team_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # تغییرات تیم‌های کاربر بعد از کرسر
+            models.Index(fields=['team_id', 'id'], name='taskchange_team_seq_idx'),
+            models.Index(fields=['created_at'], name='taskchange_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} - {'deleted' if self.deleted else 'changed'}"
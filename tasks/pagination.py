@@ -0,0 +1,189 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder زمان را تا میلی‌ثانیه کوتاه می‌کند و کرسر باید دقیق باشد
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    صفحه‌بندی keyset (cursor) روی یک ترتیب پایدار.
+    برخلاف offset، هزینه‌ی هر صفحه به عمق صفحه بستگی ندارد و
+    کرسر مقدار فیلدهای ترتیب در آخرین ردیف صفحه است.
+    آخرین فیلد ترتیب باید یکتا باشد (معمولاً id).
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, request, queryset, view=None):
+        return self.ordering
+
+    def get_query_params(self, request):
+        # Request در DRF و HttpRequest در viewهای async
+        return getattr(request, 'query_params', request.GET)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(self.get_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, queryset, ordering):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            opts = queryset.model._meta
+            return [
+                opts.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def keyset_filter(self, ordering, values):
+        # (a, b) < (x, y)  =>  a < x OR (a = x AND b < y)
+        condition = Q()
+        for i, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            branch = Q(**{f"{name.lstrip('-')}__{lookup}": values[i]})
+            for prev_name, prev_value in zip(ordering[:i], values[:i]):
+                branch &= Q(**{prev_name.lstrip('-'): prev_value})
+            condition |= branch
+        return condition
+
+    def get_page_queryset(self, queryset, cursor, ordering):
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset, ordering)
+            queryset = queryset.filter(self.keyset_filter(ordering, values))
+        return queryset
+
+    def prepare(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering_value = self.get_ordering(request, queryset, view)
+        cursor = self.get_query_params(request).get(self.cursor_query_param)
+        queryset = self.get_page_queryset(queryset, cursor, self.ordering_value)
+        # یک ردیف اضافه برای فهمیدن اینکه صفحه‌ی بعدی وجود دارد یا نه
+        return queryset[:self.page_size_value + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows = list(self.prepare(queryset, request, view))
+        return self.finish(rows)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        rows = [obj async for obj in self.prepare(queryset, request, view)]
+        return self.finish(rows)
+
+    def finish(self, rows):
+        self.has_next = len(rows) > self.page_size_value
+        page = rows[:self.page_size_value]
+        self.next_cursor = self.cursor_for(page[-1]) if self.has_next else None
+        return page
+
+    def cursor_for(self, obj):
+        return self.encode_cursor([
+            getattr(obj, name.lstrip('-')) for name in self.ordering_value
+        ])
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class TaskPagination(KeysetPagination):
+    ordering = ('-id',)
+    ordering_query_param = 'ordering'
+    # هر ترتیب با id هم‌جهت تکمیل می‌شود تا کرسر یکتا باشد و ایندکس (…, id) قابل استفاده بماند
+    ordering_fields = ('id', 'due_date', 'priority')
+
+    def get_ordering(self, request, queryset, view=None):
+        value = self.get_query_params(request).get(self.ordering_query_param)
+        if not value:
+            return self.ordering
+        name = value[1:] if value.startswith('-') else value
+        if name not in self.ordering_fields:
+            raise ValidationError({self.ordering_query_param: [
+                f"Expected one of: {', '.join(self.ordering_fields)} (prefix with - for descending)."
+            ]})
+        if name == 'id':
+            return (value,)
+        return (value, '-id' if value.startswith('-') else 'id')
+
+
+class SearchPagination(KeysetPagination):
+    """
+    صفحه‌بندی نتایج جستجو روی (score, id) که توسط backend جستجو محاسبه می‌شود
+    (نه فیلدهای مدل)؛ کرسر همان score و id آخرین نتیجه است.
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def paginate_search(self, backend, query, team_ids, request):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        after = None
+        cursor = self.get_query_params(request).get(self.cursor_query_param)
+        if cursor:
+            try:
+                padded = cursor + '=' * (-len(cursor) % 4)
+                score, task_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+                after = (float(score), int(task_id))
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+        rows = backend.search(query, team_ids, self.page_size_value + 1, after)
+        self.has_next = len(rows) > self.page_size_value
+        page = rows[:self.page_size_value]
+        if self.has_next:
+            task_id, score = page[-1]
+            self.next_cursor = self.encode_cursor([score, task_id])
+        else:
+            self.next_cursor = None
+        return page
@@ -1,33 +1,40 @@
 from rest_framework import permissions
-from .models import Team
+from teams.cache import get_user_team_ids
 from .models import Task
 
 class IsTeamMember(permissions.BasePermission):
     """
     فقط اعضای تیم می‌تونن به تسک‌های تیم خودشون دسترسی داشته باشن.
+    عضویت از کش get_user_team_ids خوانده می‌شود.
     """
 
     def has_permission(self, request, view):
-        team = None
+        team_id = None
 
         # ۱. اگر team در body وجود داشت
-        team_id = request.data.get('team')
-        if team_id:
-            team = Team.objects.filter(id=team_id).first()
+        if request.data.get('team'):
+            try:
+                team_id = int(request.data.get('team'))
+            except (TypeError, ValueError):
+                return False
 
         # ۲. در غیر این صورت اگه pk در URL هست، تیم رو از تسک پیدا کن
+        #    (اگر view متد get_task داشته باشد همان تسک بین permission و view مشترک است)
         elif view.kwargs.get('pk'):
-            task = Task.objects.filter(pk=view.kwargs['pk']).select_related('team').first()
+            if hasattr(view, 'get_task'):
+                task = view.get_task()
+            else:
+                task = Task.objects.filter(pk=view.kwargs['pk']).only('id', 'team_id').first()
             if task:
-                team = task.team
+                team_id = task.team_id
 
         # ۳. در صورتی که team پیدا شد، بررسی کن که کاربر عضوش هست یا نه
-        if team:
-            return team.members.filter(id=request.user.id).exists()
+        if team_id:
+            return team_id in get_user_team_ids(request.user.id)
 
         # اگر هیچ تیمی پیدا نشد، اجازه نده
         return False
 
     def has_object_permission(self, request, view, obj):
         # بررسی دسترسی در سطح شیء
-        return obj.team.members.filter(id=request.user.id).exists()
+        return obj.team_id in get_user_team_ids(request.user.id)
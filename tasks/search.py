@@ -0,0 +1,217 @@
+"""
+جستجوی متن کامل روی عنوان و توضیحات تسک‌ها با backend قابل تعویض.
+
+- SQLiteSearchBackend: جدول مجازی FTS5 که با signals همگام می‌شود (rowid همان id تسک است).
+- PostgresSearchBackend: ایندکس GIN روی to_tsvector همان عبارتی که در جستجو استفاده می‌شود.
+- SimpleSearchBackend: icontains برای بقیه‌ی دیتابیس‌ها (بدون رتبه‌بندی، فقط برای توسعه).
+
+با TASK_SEARCH_BACKEND (مسیر کلاس) می‌توان backend را مشخص کرد؛ در غیر این صورت
+بر اساس vendor دیتابیس انتخاب می‌شود. متن و عبارت جستجو هر دو با normalize_text
+یکسان‌سازی می‌شوند تا نویسه‌های عربی/فارسی و نیم‌فاصله تفاوتی ایجاد نکنند.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+
+# ي ى ك ۀ ة أ إ آ ٱ ؤ -> ی ی ک ه ه ا ا ا ا و، ارقام فارسی/عربی -> لاتین
+_CHAR_MAP = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ۀ': 'ه', 'ة': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ؤ': 'و',
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    # نیم‌فاصله، ZWJ و کشیده
+    '\u200c': ' ', '\u200d': '', '\u0640': '',
+})
+# اعراب (فتحه، کسره، تنوین، تشدید، ...)
+_DIACRITICS = re.compile('[\u064B-\u065F\u0670\u06D6-\u06ED]')
+_TOKEN = re.compile(r'\w+')
+
+
+def normalize_text(text):
+    if not text:
+        return ''
+    return _DIACRITICS.sub('', text.translate(_CHAR_MAP)).lower()
+
+
+def query_tokens(query):
+    return _TOKEN.findall(normalize_text(query))
+
+
+class BaseSearchBackend:
+    """
+    search خروجی (task_id, score) به ترتیب رتبه است (score کمتر = مرتبط‌تر)؛
+    after آخرین (score, id) صفحه‌ی قبل است.
+    """
+
+    def setup(self):
+        pass
+
+    def index(self, tasks):
+        pass
+
+    def remove(self, task_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def search(self, query, team_ids, limit, after=None):
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    table = 'tasks_task_fts'
+    # وزن عنوان در رتبه‌بندی bm25 بیشتر از توضیحات است
+    weights = (10.0, 1.0)
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table]
+            ).fetchone()
+            if exists:
+                return False
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+                "title, description, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        self.rebuild()
+        return True
+
+    def index(self, tasks):
+        rows = [(task.pk, normalize_text(task.title), normalize_text(task.description)) for task in tasks]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, description) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, task_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(task_id,) for task_id in task_ids])
+
+    def rebuild(self):
+        # normalize_text به صورت تابع SQL ثبت می‌شود تا پر کردن ایندکس یک INSERT ... SELECT باشد
+        connection.ensure_connection()
+        connection.connection.create_function('task_search_normalize', 1, normalize_text, deterministic=True)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, description) "
+                "SELECT id, task_search_normalize(title), task_search_normalize(description) FROM tasks_task"
+            )
+            count = cursor.rowcount
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+        return count
+
+    def match_expression(self, query):
+        tokens = query_tokens(query)
+        if not tokens:
+            return None
+        # همه‌ی کلمات لازم‌اند؛ کلمه‌ی آخر به صورت پیشوندی (جستجو هنگام تایپ)
+        terms = [f'"{token}"' for token in tokens[:-1]] + [f'"{tokens[-1]}"*']
+        return ' '.join(terms)
+
+    def search(self, query, team_ids, limit, after=None):
+        expression = self.match_expression(query)
+        if not expression or not team_ids:
+            return []
+        team_placeholders = ', '.join(['%s'] * len(team_ids))
+        params = [*self.weights, expression, *team_ids]
+        keyset = ''
+        if after:
+            keyset = "WHERE score > %s OR (score = %s AND id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql = f"""
+            SELECT id, score FROM (
+                SELECT t.id AS id, bm25({self.table}, %s, %s) AS score
+                FROM {self.table}
+                JOIN tasks_task t ON t.id = {self.table}.rowid
+                WHERE {self.table} MATCH %s AND t.team_id IN ({team_placeholders})
+            )
+            {keyset}
+            ORDER BY score, id
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    index_name = 'task_search_gin_idx'
+    # همان یکسان‌سازی normalize_text در SQL تا ایندکس و جستجو یک عبارت داشته باشند
+    document = (
+        "to_tsvector('simple', lower(regexp_replace(translate("
+        "coalesce(title, '') || ' ' || coalesce(description, ''), "
+        "'يىكۀةأإآٱؤ۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩' || chr(8204) || chr(8205) || chr(1600), "
+        "'ییکههااااو01234567890123456789 '), "
+        r"'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', 'g')))"
+    )
+
+    def setup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.index_name} ON tasks_task USING GIN (({self.document}))")
+        return True
+
+    def search(self, query, team_ids, limit, after=None):
+        tokens = query_tokens(query)
+        if not tokens or not team_ids:
+            return []
+        ts_query = ' & '.join(f"{token}:*" if i == len(tokens) - 1 else token for i, token in enumerate(tokens))
+        params = [ts_query, ts_query, list(team_ids)]
+        keyset = ''
+        if after:
+            keyset = "WHERE score > %s OR (score = %s AND id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql = f"""
+            SELECT id, score FROM (
+                SELECT id, -ts_rank({self.document}, to_tsquery('simple', %s)) AS score
+                FROM tasks_task
+                WHERE {self.document} @@ to_tsquery('simple', %s) AND team_id = ANY(%s)
+            ) ranked
+            {keyset}
+            ORDER BY score, id
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return [(row[0], row[1]) for row in cursor.fetchall()]
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    def search(self, query, team_ids, limit, after=None):
+        tokens = _TOKEN.findall(query or '')
+        if not tokens or not team_ids:
+            return []
+        tasks = Task.objects.filter(team_id__in=team_ids)
+        for token in tokens:
+            tasks = tasks.filter(Q(title__icontains=token) | Q(description__icontains=token))
+        if after:
+            tasks = tasks.filter(id__gt=after[1])
+        return [(task_id, 0.0) for task_id in tasks.order_by('id').values_list('id', flat=True)[:limit]]
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'TASK_SEARCH_BACKEND', None)
+        cls = import_string(path) if path else VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)
+        _backend = cls()
+    return _backend
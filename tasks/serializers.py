@@ -1,6 +1,22 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Task
+from teams.models import Team
+from .models import PRIORITY_NAMES, Task
+
+
+class PriorityField(serializers.ChoiceField):
+    """اولویت در API با نام (low / medium / high) و در دیتابیس با عدد"""
+    values = {name: value for value, name in PRIORITY_NAMES.items()}
+
+    def __init__(self, **kwargs):
+        super().__init__(choices=list(self.values), **kwargs)
+
+    def to_internal_value(self, data):
+        return self.values[super().to_internal_value(data)]
+
+    def to_representation(self, value):
+        return PRIORITY_NAMES.get(value, value)
+
 
 class UserSimpleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +24,7 @@ class UserSimpleSerializer(serializers.ModelSerializer):
         fields = ['id', 'username']
 
 class TaskSerializer(serializers.ModelSerializer):
+    priority = PriorityField()
     tagged_users = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), many=True, write_only=True, required=False)
     tagged_users_info = UserSimpleSerializer(source='tagged_users', many=True, read_only=True)
     creator_info = UserSimpleSerializer(source='creator', read_only=True)
@@ -24,6 +41,50 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
 
 
+class AsyncTaskInputSerializer(TaskSerializer):
+    """
+    ورودی viewهای async: فیلدهای رابطه‌ای فقط به صورت id اعتبارسنجی می‌شوند
+    (بدون کوئری) و وجودشان در view با ORM async بررسی می‌شود.
+    """
+    creator = serializers.IntegerField(read_only=True)
+    assignee = serializers.IntegerField(required=False, allow_null=True)
+    team = serializers.IntegerField()
+    tagged_users = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+
+
+class PreloadedRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    شیء مربوط به pk از نگاشت {pk: obj} که view در context گذاشته خوانده می‌شود؛
+    بنابراین اعتبارسنجی یک لیست بزرگ برای هر آیتم کوئری جداگانه نمی‌زند.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = self.context.get(self.context_key, {}).get(pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class TaskBulkItemSerializer(TaskSerializer):
+    """یک آیتم از ورودی ایجاد گروهی؛ کاربران و تیم‌ها از قبل با یک کوئری بارگذاری شده‌اند"""
+    creator = serializers.PrimaryKeyRelatedField(read_only=True)
+    assignee = PreloadedRelatedField('users', queryset=User.objects.all(), required=False, allow_null=True)
+    team = PreloadedRelatedField('teams', queryset=Team.objects.all())
+    tagged_users = PreloadedRelatedField(
+        'users', queryset=User.objects.all(), many=True, write_only=True, required=False
+    )
+
+
 class TaskAssignResponseSerializer(serializers.Serializer):
     message = serializers.CharField()
     assigned_to = serializers.DictField()
@@ -0,0 +1,111 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from teams.signals import username_changed
+from .events import deleted_event, publish_task_events, saved_event, tags_event
+from .models import Task
+from .search import get_search_backend
+from .sync import track_task_changes
+
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, signal, **kwargs):
+    # حذف به صورت tombstone در لاگ sync ثبت می‌شود
+    track_task_changes([(instance.pk, instance.team_id)], deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=Task)
+def task_saved_event(sender, instance, created, update_fields=None, **kwargs):
+    # رویداد زنده نباید ذخیره‌ی تسک را خراب کند؛ کلاینت در بدترین حالت با sync به‌روز می‌شود
+    try:
+        event = saved_event(instance, created, update_fields)
+    except Exception:
+        logger.exception("Could not build live event for task %s", instance.pk)
+        return
+    publish_task_events([event])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted_event(sender, instance, **kwargs):
+    publish_task_events([deleted_event(instance.pk, instance.team_id)])
+
+
+@receiver(post_save, sender=Task)
+def task_saved_search(sender, instance, update_fields=None, **kwargs):
+    # ایندکس جستجو در همان transaction تسک به‌روز می‌شود
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted_search(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+def setup_search(sender, **kwargs):
+    # بعد از migrate: ساخت جدول FTS / ایندکس GIN (و پر کردن اولیه اگر تازه ساخته شده).
+    # مایگریشن‌های tasks در مخزن نیستند؛ migrate قبل از makemigrations جدول تسک را نمی‌سازد
+    # و ساختن ایندکس روی آن ممکن نیست. migrate بعدی دوباره همین‌جا می‌رسد.
+    if Task._meta.db_table not in connection.introspection.table_names():
+        logger.warning("Task table does not exist yet; skipping search index setup")
+        return
+    get_search_backend().setup()
+
+
+@receiver(m2m_changed, sender=Task.tagged_users.through)
+def task_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action == 'pre_clear':
+            instance._cleared_user_ids = list(instance.tagged_users.values_list('id', flat=True))
+        elif action in ('post_add', 'post_remove', 'post_clear'):
+            track_task_changes([(instance.pk, instance.team_id)])
+            if action == 'post_clear':
+                changed = getattr(instance, '_cleared_user_ids', [])
+            else:
+                changed = pk_set or []
+            if changed:
+                added = changed if action == 'post_add' else ()
+                removed = () if action == 'post_add' else changed
+                publish_task_events([tags_event(instance.pk, instance.team_id, added, removed)])
+        return
+
+    # user.tagged_in_tasks.add/remove/clear
+    if action == 'pre_clear':
+        # بعد از clear دیگر نمی‌دانیم کدام تسک‌ها تغییر کرده‌اند
+        instance._cleared_task_rows = list(instance.tagged_in_tasks.values_list('id', 'team_id'))
+        return
+    if action == 'post_clear':
+        rows = getattr(instance, '_cleared_task_rows', [])
+    elif action in ('post_add', 'post_remove'):
+        rows = list(Task.objects.filter(pk__in=pk_set).values_list('id', 'team_id'))
+    else:
+        return
+    track_task_changes(rows)
+    user_ids = [instance.pk]
+    publish_task_events([
+        tags_event(task_id, team_id, user_ids if action == 'post_add' else (), () if action == 'post_add' else user_ids)
+        for task_id, team_id in rows
+    ])
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def user_changed(sender, instance, signal, **kwargs):
+    # username در creator_info / assignee_info / tagged_users_info تسک‌ها نمایش داده می‌شود؛
+    # حذف کاربر هم assignee را بدون post_save تسک‌ها null می‌کند
+    if signal is post_save and not username_changed(instance):
+        return
+    rows = list(
+        Task.objects.filter(Q(creator=instance) | Q(assignee=instance) | Q(tagged_users=instance))
+        .values_list('id', 'team_id').distinct()
+    )
+    track_task_changes(rows)
@@ -0,0 +1,191 @@
+"""
+sync افزایشی تسک‌ها: کلاینت به جای دانلود دوباره‌ی کل لیست، با یک کرسر فقط
+تسک‌های ساخته/ویرایش/حذف‌شده بعد از آن را می‌گیرد.
+
+هر تغییر تسک (signals.py و bulk create) یک ردیف TaskChange می‌نویسد (در هر transaction
+حداکثر یک ردیف برای هر تسک؛ track_task_changes) و کرسر
+آخرین id خوانده‌شده‌ی این لاگ است؛ بنابراین هزینه‌ی هر sync متناسب با تعداد تغییرات است
+نه تعداد تسک‌ها. چون id ها به ترتیب insert داده می‌شوند نه commit، کرسر هیچ‌وقت از
+ردیفی که کمتر از TASK_SYNC_SETTLE_SECONDS از ثبتش گذشته جلوتر نمی‌رود: مرز sync یکی
+کمتر از کوچک‌ترین id ردیف‌های تازه است (نه آخرین id ردیف‌های قدیمی، چون ترتیب created_at
+و id ممکن است یکی نباشد). TASK_SYNC_SETTLE_SECONDS باید از طولانی‌ترین transaction
+نویسنده بیشتر باشد؛ ردیف transaction طولانی‌تر تا commit دیده نمی‌شود.
+
+کرسر شامل hash تیم‌های کاربر هم هست؛ اگر عضویت عوض شده باشد یا کرسر از
+TASK_CHANGE_RETENTION قدیمی‌تر باشد، پاسخ reset=true است و کلاینت باید لیست کامل را بگیرد.
+"""
+import base64
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from team_tasks_realtime.conditional import bump_versions
+from .cache import task_version_keys
+from .fragments import get_task_fragments
+from .models import TaskChange
+
+
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 500
+
+
+def get_settle_seconds():
+    return getattr(settings, 'TASK_SYNC_SETTLE_SECONDS', 2)
+
+
+def get_retention():
+    return getattr(settings, 'TASK_CHANGE_RETENTION', 7 * 24 * 60 * 60)
+
+
+def record_task_changes(rows, deleted=False):
+    """rows: (task_id, team_id) تسک‌های تغییرکرده؛ در همان transaction تغییر نوشته می‌شود"""
+    TaskChange.objects.bulk_create([
+        TaskChange(task_id=task_id, team_id=team_id, deleted=deleted) for task_id, team_id in rows
+    ])
+
+
+class PendingTaskChanges:
+    """تغییرات تسک در transaction جاری یک connection (connection.pending_task_changes)"""
+
+    def __init__(self):
+        # (task_id, deleted) -> savepoint های باز هنگام insert ردیف TaskChange
+        self.recorded = {}
+        self.task_ids = set()
+        self.team_ids = set()
+        self.flushed = False
+
+    def is_recorded(self, key, savepoints):
+        # اگر یکی از savepoint های آن زمان بسته شده باشد (شاید با rollback) ردیف دوباره نوشته می‌شود
+        recorded_in = self.recorded.get(key)
+        return recorded_in is not None and savepoints[:len(recorded_in)] == recorded_in
+
+    def flush(self):
+        self.flushed = True
+        bump_versions(task_version_keys(self.task_ids, self.team_ids))
+
+
+def _pending_task_changes(connection):
+    pending = getattr(connection, 'pending_task_changes', None)
+    # callback پس از commit اجرا و با rollback دور ریخته می‌شود؛ اگر دیگر در صف نباشد
+    # transaction قبلی تمام شده است
+    if pending is None or pending.flushed or not any(
+        callback == pending.flush for _, callback, _ in connection.run_on_commit
+    ):
+        pending = connection.pending_task_changes = PendingTaskChanges()
+        transaction.on_commit(pending.flush, using=connection.alias)
+    return pending
+
+
+def track_task_changes(rows, deleted=False, using=None):
+    """
+    ثبت تغییر rows ((task_id, team_id)) در لاگ sync و باطل کردن نسخه‌های ETag/fragment آن‌ها.
+    در یک transaction هر تسک یک ردیف TaskChange می‌گیرد (مثلاً mention هم tagged_users.add و هم
+    save دارد) و نسخه‌ها یک بار پس از commit باطل می‌شوند.
+    """
+    rows = list(rows)
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        bump_versions(task_version_keys({row[0] for row in rows}, {row[1] for row in rows}))
+        record_task_changes(rows, deleted)
+        return
+    pending = _pending_task_changes(connection)
+    # atomic(savepoint=False) در save/add مدل None اضافه می‌کند؛ فقط savepoint های واقعی مهم‌اند
+    savepoints = tuple(sid for sid in connection.savepoint_ids if sid)
+    fresh = []
+    for task_id, team_id in rows:
+        pending.task_ids.add(task_id)
+        pending.team_ids.add(team_id)
+        if not pending.is_recorded((task_id, deleted), savepoints):
+            pending.recorded[(task_id, deleted)] = savepoints
+            fresh.append((task_id, team_id))
+    record_task_changes(fresh, deleted)
+
+
+def prune_task_changes(now=None):
+    cutoff = (now or timezone.now()) - datetime.timedelta(seconds=get_retention())
+    deleted, _ = TaskChange.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def team_set_hash(team_ids):
+    return hashlib.sha1(','.join(map(str, sorted(team_ids))).encode()).hexdigest()[:16]
+
+
+def encode_sync_cursor(seq, team_ids, issued_at):
+    raw = json.dumps({'seq': seq, 'teams': team_set_hash(team_ids), 'at': int(issued_at.timestamp())})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_sync_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return int(values['seq']), str(values['teams']), int(values['at'])
+    except Exception:
+        raise NotFound('Invalid cursor')
+
+
+def latest_settled_seq(settled):
+    """بزرگ‌ترین seq که همه‌ی ردیف‌های تا آن settle شده‌اند"""
+    # ردیف‌های تازه با ایندکس created_at (فقط چند ثانیه‌ی آخر)
+    unsettled = TaskChange.objects.filter(created_at__gte=settled).aggregate(seq=Min('id'))['seq']
+    if unsettled is not None:
+        return unsettled - 1
+    return TaskChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def sync_tasks(team_ids, cursor, limit):
+    """
+    خروجی: updated (fragment تسک‌ها)، deleted (id ها)، cursor، has_more و reset.
+    بدون کرسر (یا با کرسر نامعتبر برای این کاربر) فقط کرسر فعلی با reset=true برگردانده می‌شود.
+    """
+    now = timezone.now()
+    settled = now - datetime.timedelta(seconds=get_settle_seconds())
+    result = {'updated': [], 'deleted': [], 'has_more': False, 'reset': False}
+
+    seq = None
+    if cursor:
+        seq, teams_hash, issued_at = decode_sync_cursor(cursor)
+        if teams_hash != team_set_hash(team_ids) or issued_at < now.timestamp() - get_retention():
+            seq = None
+    if seq is None:
+        result['reset'] = True
+        result['cursor'] = encode_sync_cursor(latest_settled_seq(settled), team_ids, now)
+        return result
+
+    horizon = latest_settled_seq(settled)
+    changes = list(
+        TaskChange.objects.filter(team_id__in=team_ids, id__gt=seq, id__lte=horizon)
+        .order_by('id').values_list('id', 'task_id', 'deleted')[:limit + 1]
+    )
+    result['has_more'] = len(changes) > limit
+    changes = changes[:limit]
+    if result['has_more']:
+        # زمان صدور قبلی حفظ می‌شود تا ادامه‌ی صفحه‌ها اعتبار کرسر را تمدید نکند
+        seq = changes[-1][0]
+        issued = datetime.datetime.fromtimestamp(issued_at, tz=datetime.timezone.utc)
+    else:
+        # تیم‌های کاربر تا اینجا تغییر دیگری ندارند؛ کرسر جلو می‌رود تا sync بعدی از نقطه‌ی فعلی شروع شود
+        seq = max(seq, horizon)
+        issued = now
+
+    # آخرین تغییر هر تسک در این صفحه تعیین‌کننده است
+    latest = {}
+    for _, task_id, deleted in changes:
+        latest.pop(task_id, None)
+        latest[task_id] = deleted
+    live_ids = [task_id for task_id, deleted in latest.items() if not deleted]
+    team_set = set(team_ids)
+    updated = [data for data in get_task_fragments(live_ids) if data['team'] in team_set]
+    updated_ids = {data['id'] for data in updated}
+
+    result['updated'] = updated
+    result['deleted'] = [task_id for task_id in latest if task_id not in updated_ids]
+    result['cursor'] = encode_sync_cursor(seq, team_ids, issued)
+    return result
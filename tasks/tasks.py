@@ -0,0 +1,19 @@
+import logging
+
+from celery import shared_task
+
+from .sync import prune_task_changes
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def prune_task_change_log():
+    """
+    حذف ردیف‌های لاگ تغییرات قدیمی‌تر از TASK_CHANGE_RETENTION؛
+    کلاینتی که cursor قدیمی‌تر دارد با reset=true لیست کامل را دوباره می‌گیرد.
+    """
+    pruned = prune_task_changes()
+    logger.info("Pruned %d task change(s)", pruned)
+    return pruned
@@ -1,3 +1,592 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from notifications.models import Notification
+from notifications.tasks import broadcast_team_events_task
+from team_tasks_realtime.testing import LOCAL_SETTINGS
+from teams.models import Team
+from .cache import task_version_keys
+from .events import saved_event
+from .filters import filter_tasks
+from .mentions import parse_mentions, resolve_mentions, resolve_mentions_bulk
+from .models import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_MEDIUM, Task, TaskChange
+from .pagination import TaskPagination
+from .search import normalize_text, query_tokens
+from .signals import setup_search
+from .sync import decode_sync_cursor, encode_sync_cursor, sync_tasks
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TaskEventTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user)
+        self.task = Task.objects.create(
+            title='t', team=self.team, creator=self.user, priority=PRIORITY_LOW,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+
+    def published(self, save):
+        with mock.patch('tasks.events.schedule_team_events') as broadcast:
+            with self.captureOnCommitCallbacks(execute=True):
+                save()
+        return [event for call in broadcast.call_args_list for _, event in call.args[0]]
+
+    def test_update_sends_only_changed_fields(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.priority = PRIORITY_HIGH
+        events = self.published(task.save)
+        self.assertEqual(events, [{
+            'type': 'task.updated', 'task': task.pk, 'team': self.team.pk, 'changes': {'priority': 'high'},
+        }])
+
+    def test_due_date_given_as_string_or_naive_datetime(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.due_date = '2030-01-02T10:00:00'
+        event = saved_event(task)
+        self.assertEqual(event['changes']['due_date'], '2030-01-02T10:00:00+03:30')
+
+        task.due_date = datetime.datetime(2030, 1, 3, 10, 0)
+        event = saved_event(task)
+        self.assertEqual(event['changes']['due_date'], '2030-01-03T10:00:00+03:30')
+
+    def test_event_failure_does_not_break_save(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'changed'
+        with mock.patch('tasks.signals.saved_event', side_effect=ValueError):
+            with self.assertLogs('tasks.signals', 'ERROR'):
+                self.published(task.save)
+        self.assertEqual(Task.objects.get(pk=task.pk).title, 'changed')
+
+    def test_events_are_sent_from_celery_not_the_request(self):
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'changed'
+        with mock.patch('notifications.tasks.broadcast_team_events_task.delay') as delay, \
+                mock.patch('notifications.utils.get_channel_layer') as get_layer:
+            with self.captureOnCommitCallbacks(execute=True):
+                task.save()
+        get_layer.assert_not_called()
+        (events,), _ = delay.call_args
+        self.assertEqual(events, [(self.team.pk, {
+            'type': 'task.updated', 'task': task.pk, 'team': self.team.pk, 'changes': {'title': 'changed'},
+        })])
+
+        # worker همان رویدادها را (پس از سریال‌سازی JSON) به گروه تیم می‌فرستد
+        layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch('notifications.utils.get_channel_layer', return_value=layer):
+            broadcast_team_events_task.apply(args=[json.loads(json.dumps(events))])
+        layer.group_send.assert_awaited_once_with(f'team_{self.team.pk}', {'type': 'team_event', 'content': events[0][1]})
+
+
+@override_settings(TASK_SYNC_SETTLE_SECONDS=2, **LOCAL_SETTINGS)
+class SyncCursorTests(TestCase):
+    team_ids = [7]
+
+    def change(self, age, task_id):
+        created_at = timezone.now() - datetime.timedelta(seconds=age)
+        return TaskChange.objects.create(task_id=task_id, team_id=7, deleted=True, created_at=created_at).id
+
+    def sync(self, seq):
+        result = sync_tasks(self.team_ids, encode_sync_cursor(seq, self.team_ids, timezone.now()), 100)
+        return result, decode_sync_cursor(result['cursor'])[0]
+
+    def test_cursor_stops_before_unsettled_row(self):
+        first = self.change(60, 1)
+        fresh = self.change(0, 2)
+        # id بزرگ‌تر ولی created_at قدیمی‌تر (ترتیب insert و created_at یکی نیست)
+        self.change(60, 3)
+
+        result, seq = self.sync(0)
+        self.assertEqual(result['deleted'], [1])
+        self.assertEqual(seq, first)
+
+        TaskChange.objects.filter(id=fresh).update(created_at=timezone.now() - datetime.timedelta(seconds=60))
+        result, seq = self.sync(seq)
+        self.assertEqual(result['deleted'], [2, 3])
+
+    def test_reset_cursor_is_capped_at_unsettled_row(self):
+        first = self.change(60, 1)
+        self.change(0, 2)
+        self.change(60, 3)
+        result = sync_tasks(self.team_ids, None, 100)
+        self.assertTrue(result['reset'])
+        self.assertEqual(decode_sync_cursor(result['cursor'])[0], first)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TaskPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='arash')
+        cls.teams = [Team.objects.create(name=f'team {index}') for index in range(3)]
+        start = timezone.now()
+        priorities = [PRIORITY_LOW, PRIORITY_MEDIUM, PRIORITY_HIGH]
+        Task.objects.bulk_create([
+            Task(
+                title=f'task {index}', team=cls.teams[index % 3], priority=priorities[index // 3 % 3],
+                # موعدهای تکراری تا کرسر به id هم نیاز داشته باشد
+                due_date=start + datetime.timedelta(hours=index // 4),
+            )
+            for index in range(40)
+        ])
+
+    def read_all(self, query, team_ids, page_size=7):
+        ids, cursor = [], None
+        while True:
+            params = {**query, 'page_size': page_size, **({'cursor': cursor} if cursor else {})}
+            request = RequestFactory().get('/api/tasks/', params)
+            request.user = self.user
+            queryset = filter_tasks(Task.objects.filter(team_id__in=team_ids), request).only('id', 'due_date', 'priority')
+            paginator = TaskPagination()
+            page = paginator.paginate_queryset(queryset, request)
+            ids.extend(task.id for task in page)
+            cursor = paginator.next_cursor
+            if not cursor:
+                return ids
+
+    def expected(self, team_ids, ordering, **filters):
+        name = ordering.lstrip('-')
+        tiebreak = '-id' if ordering.startswith('-') else 'id'
+        return list(
+            Task.objects.filter(team_id__in=team_ids, **filters)
+            .order_by(*((ordering,) if name == 'id' else (ordering, tiebreak))).values_list('id', flat=True)
+        )
+
+    def test_keyset_pages_cover_every_task_once(self):
+        team_ids = [team.id for team in self.teams]
+        for ordering in ('-id', 'due_date', '-due_date', 'priority', '-priority'):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(self.read_all({'ordering': ordering}, team_ids), self.expected(team_ids, ordering))
+
+
+@override_settings(**LOCAL_SETTINGS)
+class OverdueTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.task = Task.objects.create(
+            title='t', team=self.team, assignee=self.user, priority=PRIORITY_LOW,
+            due_date=timezone.now() - datetime.timedelta(hours=1),
+        )
+
+    def scan(self):
+        from notifications.tasks import check_overdue_tasks
+        with mock.patch('notifications.utils.schedule_outbox_dispatch'):
+            return check_overdue_tasks()
+
+    def test_new_due_date_is_checked_again(self):
+        self.assertEqual(self.scan(), 1)
+        self.assertEqual(self.scan(), 0)
+
+        task = Task.objects.only('id', 'due_date').get(pk=self.task.pk)
+        task.due_date = timezone.now() - datetime.timedelta(minutes=1)
+        task.save(update_fields=['due_date'])
+        self.assertIsNone(Task.objects.get(pk=task.pk).overdue_notified_at)
+        self.assertEqual(self.scan(), 1)
+
+    def test_other_edits_keep_the_mark(self):
+        self.scan()
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = 'changed'
+        task.save()
+        self.assertIsNotNone(Task.objects.get(pk=task.pk).overdue_notified_at)
+
+    def test_rows_locked_by_another_run_are_skipped(self):
+        # select_for_update(skip_locked=True): ردیف‌هایی که اجرای دیگر برداشته برگردانده نمی‌شوند
+        with mock.patch('django.db.models.query.QuerySet.select_for_update', autospec=True,
+                        side_effect=lambda qs, **kwargs: qs.none()) as select_for_update:
+            self.assertEqual(self.scan(), 0)
+        self.assertEqual(select_for_update.call_args.kwargs, {'skip_locked': True})
+
+
+@override_settings(**LOCAL_SETTINGS)
+class MentionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.team = Team.objects.create(name='team')
+        self.sara = User.objects.create(username='sara')
+        self.team.members.add(self.sara)
+        User.objects.create(username='outsider')
+
+    def test_parse_keeps_first_occurrence_order(self):
+        self.assertEqual(parse_mentions('@sara و @ali، دوباره @sara'), ['sara', 'ali'])
+        self.assertEqual(parse_mentions(''), [])
+
+    def test_only_team_members_are_resolved(self):
+        text = '@outsider @sara @nobody'
+        self.assertEqual(resolve_mentions(self.team.pk, text), [(self.sara.pk, 'sara')])
+        # ایندکس اعضا یک بار خوانده می‌شود و بار دوم از کش می‌آید
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_mentions(self.team.pk, text), [(self.sara.pk, 'sara')])
+
+    def test_bulk_reads_each_team_index_once(self):
+        other = Team.objects.create(name='other')
+        items = [(self.team.pk, '@sara'), (other.pk, '@sara'), (self.team.pk, '@outsider @sara'), (other.pk, 'بدون نام')]
+        with self.assertNumQueries(2):
+            result = resolve_mentions_bulk(items)
+        self.assertEqual(result, [[(self.sara.pk, 'sara')], [], [(self.sara.pk, 'sara')], []])
+
+
+@override_settings(**LOCAL_SETTINGS)
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user)
+        # ایجاد در transaction خودش commit می‌شود؛ تغییرات بعدی transaction جدیدی دارند
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task = Task.objects.create(
+                title='t', team=self.team, creator=self.user, priority=PRIORITY_MEDIUM,
+                due_date=timezone.now() + datetime.timedelta(days=1),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def revalidate(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def test_list_not_modified_until_task_changes(self):
+        etag = self.revalidate('/api/tasks/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=self.task.pk).get().save()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_not_modified_until_task_changes(self):
+        url = f'/api/tasks/{self.task.pk}/'
+        etag = self.revalidate(url)
+        # تا commit نشده نسخه عوض نمی‌شود
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.title = 'new'
+            self.task.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'new')
+
+    def test_weak_comparison_and_wildcard(self):
+        etag = self.revalidate('/api/tasks/')
+        header = f'"other", {etag[2:]}'
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=header).status_code, 304)
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH='*').status_code, 304)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class SearchTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_normalize_text(self):
+        # ی و ک عربی، نیم‌فاصله، کشیده، اعراب و ارقام فارسی
+        self.assertEqual(normalize_text('كتاب‌هاي ۱۲'), 'کتاب های 12')
+        self.assertEqual(normalize_text('مـــدیریّت'), 'مدیریت')
+        self.assertEqual(normalize_text('آزمون Login'), 'ازمون login')
+        self.assertEqual(query_tokens('  گزارش‌ها، ٣ '), ['گزارش', 'ها', '3'])
+
+    def test_arabic_characters_match_persian_query(self):
+        task = Task.objects.create(
+            title='گزارش‌هاي فروش', description='', team=self.team, creator=self.user, priority=PRIORITY_MEDIUM,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+        Task.objects.create(
+            title='طراحی صفحه', description='', team=self.team, creator=self.user, priority=PRIORITY_MEDIUM,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+        for query in ('گزارش های', 'گزارش‌های فرو', 'فروش'):
+            response = self.client.get('/api/tasks/search/', {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([item['id'] for item in response.data['results']], [task.pk], query)
+
+    def test_other_teams_are_not_searched(self):
+        other = Team.objects.create(name='other')
+        Task.objects.create(
+            title='گزارش', description='', team=other, creator=self.user, priority=PRIORITY_MEDIUM,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+        response = self.client.get('/api/tasks/search/', {'q': 'گزارش'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_setup_waits_for_the_task_table(self):
+        backend = mock.Mock()
+        with mock.patch('tasks.signals.get_search_backend', return_value=backend), \
+                mock.patch.object(connection.introspection, 'table_names', return_value=[]), \
+                self.assertLogs('tasks.signals', 'WARNING'):
+            setup_search(sender=None)
+        backend.setup.assert_not_called()
+        setup_search(sender=None)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class AsyncTaskViewTests(TransactionTestCase):
+    # ASGIHandler هر درخواست را در ThreadSensitiveContext جدا اجرا می‌کند؛ ORM آن connection خودش را دارد
+
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.sara = User.objects.create(username='sara')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user, self.sara)
+        self.other_team = Team.objects.create(name='other')
+        self.task = Task.objects.create(
+            title='t', description='', team=self.team, creator=self.user, priority=PRIORITY_MEDIUM,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+        self.client = AsyncClient()
+        self.token = Token.objects.create(user=self.user).key
+
+    def post(self, url, data, **kwargs):
+        return self.client.post(
+            url, data, content_type='application/json', headers={'Authorization': f'Token {self.token}'}, **kwargs
+        )
+
+    def create_data(self, **fields):
+        return {
+            'title': 'جدید', 'description': 'بررسی کن @sara', 'priority': 'high',
+            'due_date': '2030-01-01T10:00:00+03:30', 'team': self.team.pk, 'assignee': self.sara.pk, **fields,
+        }
+
+    async def test_create(self):
+        response = await self.post('/api/tasks/async/create/', self.create_data())
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['tagged_users_info'], [{'id': self.sara.pk, 'username': 'sara'}])
+        types = [n.type async for n in Notification.objects.filter(task_id=data['id']).order_by('type')]
+        self.assertEqual(types, ['assignment', 'mention'])
+
+    async def test_create_in_foreign_team_is_denied(self):
+        response = await self.post('/api/tasks/async/create/', self.create_data(team=self.other_team.pk))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(await Task.objects.filter(title='جدید').aexists())
+
+    async def test_create_writes_nothing_when_notifications_fail(self):
+        with mock.patch('tasks.async_views.send_bulk_realtime_notifications', side_effect=OSError):
+            with self.assertRaises(OSError):
+                await self.post('/api/tasks/async/create/', self.create_data())
+        self.assertFalse(await Task.objects.filter(title='جدید').aexists())
+
+    async def test_assign(self):
+        url = f'/api/tasks/async/{self.task.pk}/assign/'
+        response = await self.post(url, {'assignee_id': self.sara.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['assigned_to'], {'id': self.sara.pk, 'username': 'sara'})
+        self.assertTrue(await Notification.objects.filter(user=self.sara, type='assignment').aexists())
+
+        outsider = await User.objects.acreate(username='outsider')
+        response = await self.post(url, {'assignee_id': outsider.pk})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_assign_in_foreign_team_is_denied(self):
+        task = await Task.objects.acreate(
+            title='x', team=self.other_team, creator=self.sara, priority=PRIORITY_MEDIUM,
+            due_date=timezone.now() + datetime.timedelta(days=1),
+        )
+        response = await self.post(f'/api/tasks/async/{task.pk}/assign/', {'assignee_id': self.user.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone((await Task.objects.aget(pk=task.pk)).assignee_id)
+
+    async def test_mention(self):
+        url = f'/api/tasks/async/{self.task.pk}/mention/'
+        with mock.patch('tasks.async_views.send_bulk_realtime_notifications', side_effect=OSError):
+            with self.assertRaises(OSError):
+                await self.post(url, {'description': '@sara'})
+        # تگ و توضیح بدون نوتیفیکیشن ذخیره نمی‌شوند
+        self.assertFalse(await self.task.tagged_users.aexists())
+
+        response = await self.post(url, {'description': '@sara @outsider'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tagged_users'], [{'id': self.sara.pk, 'username': 'sara'}])
+        self.assertEqual([user.pk async for user in self.task.tagged_users.all()], [self.sara.pk])
+        self.assertEqual((await Task.objects.aget(pk=self.task.pk)).description, '@sara @outsider')
+
+    async def test_mention_without_membership_is_denied(self):
+        self.token = (await Token.objects.acreate(user=await User.objects.acreate(username='x'))).key
+        response = await self.post(f'/api/tasks/async/{self.task.pk}/mention/', {'description': '@sara'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_malformed_bodies(self):
+        urls = [
+            '/api/tasks/async/create/',
+            f'/api/tasks/async/{self.task.pk}/assign/',
+            f'/api/tasks/async/{self.task.pk}/mention/',
+        ]
+        for url in urls:
+            for body in ('[1]', '"x"', '{'):
+                response = await self.post(url, body)
+                self.assertEqual(response.status_code, 400, (url, body))
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TaskBulkCreateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.sara = User.objects.create(username='sara')
+        self.outsider = User.objects.create(username='outsider')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user, self.sara)
+        self.other_team = Team.objects.create(name='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def items(self, count, **fields):
+        return [{
+            'title': f't{i}', 'description': '@sara بررسی کن', 'priority': 'low',
+            'due_date': '2030-01-01T10:00:00+03:30', 'team': self.team.pk, 'assignee': self.sara.pk,
+            'tagged_users': [self.user.pk], **fields,
+        } for i in range(count)]
+
+    def create(self, items):
+        with mock.patch('tasks.views.send_bulk_realtime_notifications') as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/tasks/bulk/', items, format='json')
+        return response, send
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        # کش عضویت و ایندکس اعضا گرم است تا فقط کوئری‌های خود ایجاد شمرده شوند
+        self.create(self.items(1))
+        with CaptureQueriesContext(connection) as queries:
+            self.create(self.items(2))
+        with self.assertNumQueries(len(queries)):
+            response, _ = self.create(self.items(20))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 20)
+
+    def test_foreign_team_denies_the_whole_batch(self):
+        items = self.items(3)
+        items[1]['team'] = self.other_team.pk
+        response, send = self.create(items)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Task.objects.exists())
+        send.assert_not_called()
+
+    def test_mentions_and_tags_are_limited_to_team_members(self):
+        items = self.items(2, description='@sara و @outsider', tagged_users=[self.user.pk, self.outsider.pk])
+        response, _ = self.create(items)
+        self.assertEqual(response.status_code, 201)
+        for task in Task.objects.all():
+            self.assertEqual(set(task.tagged_users.values_list('id', flat=True)), {self.user.pk, self.sara.pk})
+
+    def test_one_notification_batch_per_request(self):
+        response, send = self.create(self.items(3))
+        self.assertEqual(response.status_code, 201)
+        send.assert_called_once()
+        (items,), _ = send.call_args
+        # یک تخصیص و یک mention برای هر تسک
+        self.assertEqual(sorted(item[1] for item in items), ['assignment'] * 3 + ['mention'] * 3)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TaskListQueryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_tasks(self, count):
+        # هر تسک creator، assignee و کاربران تگ‌شده‌ی خودش را دارد تا N+1 دیده شود
+        for _ in range(count):
+            index = Task.objects.count()
+            creator, assignee, tagged = (
+                User.objects.create(username=f'{role}{index}') for role in ('creator', 'assignee', 'tagged')
+            )
+            task = Task.objects.create(
+                title=f'task {index}', team=self.team, creator=creator, assignee=assignee,
+                priority=PRIORITY_MEDIUM, due_date=timezone.now() + datetime.timedelta(days=1),
+            )
+            task.tagged_users.add(tagged, creator)
+
+    def page_queries(self, page_size):
+        # کش fragment سرد است تا همه‌ی ردیف‌ها سریال شوند
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/', {'page_size': page_size})
+        self.assertEqual(len(response.data['results']), page_size)
+        self.assertEqual(len(response.data['results'][0]['tagged_users_info']), 2)
+        return len(queries)
+
+    def test_query_count_per_page_is_constant(self):
+        self.add_tasks(5)
+        small = self.page_queries(5)
+        self.add_tasks(45)
+        with self.assertNumQueries(small):
+            self.page_queries(50)
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TaskChangeTrackingTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        self.sara = User.objects.create(username='sara')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user, self.sara)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task = Task.objects.create(
+                title='t', team=self.team, creator=self.user, priority=PRIORITY_MEDIUM,
+                due_date=timezone.now() + datetime.timedelta(days=1),
+            )
+        TaskChange.objects.all().delete()
+
+    def test_mention_records_one_change_and_one_bump(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch('tasks.sync.bump_versions') as bump, \
+                mock.patch('tasks.views.send_bulk_realtime_notifications'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(f'/api/tasks/{self.task.pk}/mention/', {'description': '@sara'})
+        self.assertEqual(response.status_code, 200)
+        # tagged_users.add و save در یک transaction
+        self.assertEqual(TaskChange.objects.filter(task_id=self.task.pk).count(), 1)
+        bump.assert_called_once()
+        self.assertCountEqual(bump.call_args.args[0], task_version_keys([self.task.pk], [self.team.pk]))
+
+    def test_change_rolled_back_with_savepoint_is_recorded_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                with self.assertRaises(ValueError), transaction.atomic():
+                    self.task.save()
+                    raise ValueError
+                self.task.save()
+        self.assertEqual(TaskChange.objects.filter(task_id=self.task.pk).count(), 1)
+
+    def test_next_transaction_records_again(self):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.task.save()
+        self.assertEqual(TaskChange.objects.filter(task_id=self.task.pk).count(), 2)
+        task_id = self.task.pk
+        self.task.delete()
+        self.assertEqual(TaskChange.objects.filter(task_id=task_id, deleted=True).count(), 1)
@@ -1,10 +1,23 @@
 from django.urls import path
-from .views import TaskCreateView, TaskListView, TaskDetailView, TaskAssignView, TaskMentionView
+from .views import TaskCreateView, TaskBulkCreateView, TaskListView, TaskSearchView, TaskSyncView, TaskDetailView, TaskAssignView, TaskMentionView
+from .async_views import (
+    AsyncTaskCreateView, AsyncTaskListView, AsyncTaskDetailView, AsyncTaskAssignView, AsyncTaskMentionView
+)
 
 urlpatterns = [
     path('', TaskListView.as_view(), name='task-list'),
     path('create/', TaskCreateView.as_view(), name='task-create'),
+    path('bulk/', TaskBulkCreateView.as_view(), name='task-bulk-create'),
+    path('search/', TaskSearchView.as_view(), name='task-search'),
+    path('sync/', TaskSyncView.as_view(), name='task-sync'),
     path('<int:pk>/', TaskDetailView.as_view(), name='task-detail'),
     path('<int:pk>/assign/', TaskAssignView.as_view(), name='task-assign'),
     path('<int:pk>/mention/', TaskMentionView.as_view(), name='task-mention'),
+
+    # نسخه‌ی async همین endpointها (برای اجرا روی ASGI)
+    path('async/', AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/create/', AsyncTaskCreateView.as_view(), name='async-task-create'),
+    path('async/<int:pk>/', AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    path('async/<int:pk>/assign/', AsyncTaskAssignView.as_view(), name='async-task-assign'),
+    path('async/<int:pk>/mention/', AsyncTaskMentionView.as_view(), name='async-task-mention'),
 ]
@@ -1,13 +1,38 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .serializers import TaskSerializer, TaskAssignResponseSerializer, TaskMentionRequestSerializer, TaskMentionResponseSerializer
+from .serializers import TaskSerializer, TaskAssignResponseSerializer, TaskMentionRequestSerializer, TaskMentionResponseSerializer, TaskBulkItemSerializer
 from .models import Task
 from django.contrib.auth.models import User
-import re
+from django.db import transaction
+from .mentions import parse_mentions, resolve_mentions, resolve_mentions_bulk
+from .messages import assignment_notification, mention_notifications
+from .pagination import SearchPagination, TaskPagination
+from .events import publish_task_events, saved_event, tags_event
+from .search import get_search_backend
+from .sync import SYNC_MAX_PAGE_SIZE, SYNC_PAGE_SIZE, record_task_changes, sync_tasks
 from .permissions import IsTeamMember
-from drf_spectacular.utils import extend_schema, OpenApiExample
-from notifications.utils import send_realtime_notification
+from teams.cache import get_team_member_index, get_user_team_ids
+from teams.models import Team
+from team_tasks_realtime.conditional import bump_versions, etag_matches, get_versions, make_etag, not_modified, with_etag
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiParameter, OpenApiResponse
+from .cache import task_version_key, task_version_keys, team_tasks_version_key
+from .filters import filter_tasks
+from .fragments import get_task_fragments
+from notifications.utils import send_realtime_notification, send_bulk_realtime_notifications
+
+
+class TaskObjectMixin:
+    """
+    تسک مربوط به pk در URL فقط یک بار در هر درخواست خوانده می‌شود؛
+    IsTeamMember و خود view از همین نمونه استفاده می‌کنند.
+    """
+    task_queryset = Task.objects.all()
+
+    def get_task(self):
+        if not hasattr(self, '_task'):
+            self._task = self.task_queryset.filter(pk=self.kwargs['pk']).first()
+        return self._task
 
 
 class TaskCreateView(APIView):
@@ -58,79 +83,334 @@ class TaskCreateView(APIView):
     def post(self, request):
         serializer = TaskSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        task = serializer.save(creator=request.user)
-        if task.assignee:
-            message = f"وظیفه '{task.title}' به شما واگذار شد."
-            send_realtime_notification(
-                user=task.assignee,
-                type_='assignment',
-                title='تخصیص وظیفه جدید',
-                message=message,
-                task=task
-            )
-        # استخراج @mention ها
-        mentions = re.findall(r'@(\w+)', task.description)
-        tagged_users = []
-        for username in mentions:
-            try:
-                user = User.objects.get(username=username)
-                tagged_users.append(user)
-            except User.DoesNotExist:
-                continue
-        if tagged_users:
-            task.tagged_users.add(*tagged_users)
-        # TODO: ارسال نوتیفیکیشن بلادرنگ
-            for user in tagged_users:
-                message = f"{request.user.username} شما را در وظیفه '{task.title}' تگ کرد."
-                send_realtime_notification(
-                    user=user,
-                    type_='mention',
-                    title='تگ شدن در وظیفه',
-                    message=message,
-                    task=task
-                )
+        with transaction.atomic():
+            task = serializer.save(creator=request.user)
+            notifications = []
+            if task.assignee:
+                notifications.append(assignment_notification(task, task.assignee))
+            # استخراج @mention ها (فقط اعضای تیم)
+            mentioned = resolve_mentions(task.team_id, task.description)
+            if mentioned:
+                task.tagged_users.add(*[user_id for user_id, _ in mentioned])
+                notifications.extend(mention_notifications(task, request.user, [user_id for user_id, _ in mentioned]))
+            # همه‌ی نوتیفیکیشن‌ها با یک insert در همین transaction؛ ارسال بعد از commit
+            send_bulk_realtime_notifications(notifications)
 
         return Response(TaskSerializer(task).data, status=status.HTTP_201_CREATED)
 
 
-class TaskListView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+def _pk_values(values):
+    # فقط برای پیش‌بارگذاری؛ مقادیر نامعتبر را خود serializer گزارش می‌کند
+    pks = set()
+    for value in values:
+        if isinstance(value, bool):
+            continue
+        try:
+            pks.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return pks
 
 
+class TaskBulkCreateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    max_batch_size = 500
+
     @extend_schema(
-        responses={200: TaskSerializer(many=True)},
-        summary="دریافت لیست تسک‌های تیم‌های کاربر",
-        description="تمام تسک‌هایی که کاربر عضو تیم آن‌هاست، در این endpoint برگردانده می‌شود.",
+        request=TaskBulkItemSerializer(many=True),
+        responses={201: TaskSerializer(many=True)},
+        summary="ایجاد گروهی تسک‌ها",
+        description=(
+            "لیستی از تسک‌ها با یک درخواست ساخته می‌شود (حداکثر ۵۰۰ مورد).\n"
+            "کاربر باید عضو تیم همه‌ی تسک‌ها باشد؛ در غیر این صورت هیچ تسکی ساخته نمی‌شود. "
+            "@mention ها مثل ایجاد تکی پردازش می‌شوند و همه‌ی نوتیفیکیشن‌ها یکجا ارسال می‌شوند. "
+            "tagged_users و @mention ها فقط برای اعضای تیم هر تسک اعمال می‌شوند."
+        ),
         tags=['Tasks'],
         examples=[
             OpenApiExample(
-                "نمونه پاسخ لیست تسک‌ها",
+                name="نمونه درخواست ایجاد گروهی",
                 value=[
                     {
-                        "id": 1,
-                        "title": "رفع باگ لاگین",
-                        "description": "بررسی کن @mohammad",
-                        "due_date": "2025-11-05T09:00:00+03:30",
+                        "title": "طراحی صفحه‌ی ورود",
+                        "description": "@sara لطفاً بررسی کن",
+                        "due_date": "2025-11-04T06:00:00+03:30",
+                        "priority": "high",
+                        "assignee": 2,
+                        "team": 1
+                    },
+                    {
+                        "title": "نوشتن تست‌ها",
+                        "due_date": "2025-11-06T06:00:00+03:30",
                         "priority": "medium",
-                        "creator_info": {"id": 1, "username": "arash"},
-                        "assignee_info": {"id": 2, "username": "mohammad"},
-                        "tagged_users_info": [{"id": 2, "username": "mohammad"}],
                         "team": 1
                     }
                 ],
+                request_only=True,
+            ),
+        ]
+    )
+    def post(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Expected a non-empty list of tasks."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response(
+                {"detail": f"At most {self.max_batch_size} tasks per request."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # همه‌ی کاربران و تیم‌های ارجاع‌شده با دو کوئری بارگذاری می‌شوند
+        user_ids, team_ids = set(), set()
+        for item in items:
+            if isinstance(item, dict):
+                tagged = item.get('tagged_users')
+                user_ids |= _pk_values([item.get('assignee')] + (tagged if isinstance(tagged, list) else []))
+                team_ids |= _pk_values([item.get('team')])
+        context = {
+            'users': User.objects.only('id', 'username').in_bulk(user_ids),
+            'teams': Team.objects.only('id').in_bulk(team_ids),
+        }
+        serializer = TaskBulkItemSerializer(data=items, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        validated = serializer.validated_data
+
+        # عضویت یک بار برای همه‌ی تیم‌ها (از کش) بررسی می‌شود
+        member_of = get_user_team_ids(request.user.id)
+        if any(data['team'].id not in member_of for data in validated):
+            return Response(
+                {"detail": "You do not have permission to perform this action."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([
+                Task(creator=request.user, **{key: value for key, value in data.items() if key != 'tagged_users'})
+                for data in validated
+            ])
+
+            # @mention ها با یک ایندکس برای هر تیم و tagged_users با یک insert
+            Tagged = Task.tagged_users.through
+            tagged_rows = []
+            notifications = []
+            events = []
+            mentions = resolve_mentions_bulk((task.team_id, task.description) for task in tasks)
+            # tagged_users هم مثل @mention ها فقط بین اعضای تیم پذیرفته می‌شود (یک ایندکس برای هر تیم)
+            member_ids = {}
+            for task, data, mentioned in zip(tasks, validated, mentions):
+                mentioned_ids = [user_id for user_id, _ in mentioned]
+                tagged = [user.id for user in data.get('tagged_users', [])]
+                if tagged and task.team_id not in member_ids:
+                    member_ids[task.team_id] = set(get_team_member_index(task.team_id).values())
+                tagged = [user_id for user_id in tagged if user_id in member_ids.get(task.team_id, ())]
+                tagged_ids = dict.fromkeys(tagged + mentioned_ids)
+                tagged_rows.extend(Tagged(task_id=task.id, user_id=user_id) for user_id in tagged_ids)
+                events.append(saved_event(task, created=True))
+                if tagged_ids:
+                    events.append(tags_event(task.id, task.team_id, added=tagged_ids))
+                if task.assignee:
+                    notifications.append(assignment_notification(task, task.assignee))
+                notifications.extend(mention_notifications(task, request.user, mentioned_ids))
+            Tagged.objects.bulk_create(tagged_rows)
+
+            # bulk_create سیگنال post_save / m2m_changed ندارد
+            bump_versions(task_version_keys([], {task.team_id for task in tasks}))
+            record_task_changes((task.id, task.team_id) for task in tasks)
+            get_search_backend().index(tasks)
+            publish_task_events(events)
+            send_bulk_realtime_notifications(notifications)
+
+        data = get_task_fragments(task.id for task in tasks)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class TaskListView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+
+    @extend_schema(
+        responses={200: TaskSerializer(many=True), 304: OpenApiResponse(description="تغییری نکرده است")},
+        summary="دریافت لیست تسک‌های تیم‌های کاربر",
+        description=(
+            "تسک‌های تیم‌هایی که کاربر عضو آن‌هاست به صورت صفحه‌بندی‌شده (cursor) برگردانده می‌شود.\n"
+            "برای صفحه‌ی بعد، لینک next را دنبال کنید یا پارامتر cursor را بفرستید. "
+            "اندازه‌ی صفحه با page_size قابل تنظیم است.\n"
+            "فیلترها و ordering در سمت سرور اعمال می‌شوند (مثلاً ?assignee=me&priority=high&ordering=due_date).\n"
+            "پاسخ هدر ETag دارد؛ با ارسال آن در If-None-Match اگر تغییری نبوده باشد 304 برگردانده می‌شود."
+        ),
+        tags=['Tasks'],
+        parameters=[
+            OpenApiParameter('cursor', str, description="کرسر صفحه‌ی بعد"),
+            OpenApiParameter('page_size', int, description="اندازه‌ی صفحه"),
+            OpenApiParameter('team', int, description="فقط تسک‌های یک تیم"),
+            OpenApiParameter('assignee', str, description="id کاربر یا me"),
+            OpenApiParameter('creator', str, description="id کاربر یا me"),
+            OpenApiParameter('priority', str, description="یک یا چند مقدار با کاما: low,medium,high"),
+            OpenApiParameter('due_after', str, description="موعد از این زمان به بعد (ISO 8601)"),
+            OpenApiParameter('due_before', str, description="موعد قبل از این زمان (ISO 8601)"),
+            OpenApiParameter('tagged_me', bool, description="فقط تسک‌هایی که کاربر در آن‌ها تگ شده"),
+            OpenApiParameter(
+                'ordering', str,
+                enum=['id', '-id', 'due_date', '-due_date', 'priority', '-priority'],
+                description="ترتیب نتایج (پیش‌فرض -id)"
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                "نمونه پاسخ لیست تسک‌ها",
+                value={
+                    "next": "http://localhost:8000/api/tasks/?cursor=WzQxXQ",
+                    "results": [
+                        {
+                            "id": 1,
+                            "title": "رفع باگ لاگین",
+                            "description": "بررسی کن @mohammad",
+                            "due_date": "2025-11-05T09:00:00+03:30",
+                            "priority": "medium",
+                            "creator_info": {"id": 1, "username": "arash"},
+                            "assignee_info": {"id": 2, "username": "mohammad"},
+                            "tagged_users_info": [{"id": 2, "username": "mohammad"}],
+                            "team": 1
+                        }
+                    ]
+                },
                 response_only=True
             )
         ]
     )  
     def get(self, request):
-        tasks = Task.objects.filter(team__members=request.user)
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data)
+        # ETag فقط از کش ساخته می‌شود: تیم‌های کاربر و نسخه‌ی تسک‌های هر تیم
+        team_ids = sorted(get_user_team_ids(request.user.id))
+        etag = make_etag(
+            request.build_absolute_uri(), request.user.id, team_ids,
+            get_versions(team_tasks_version_key(team_id) for team_id in team_ids)
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # صفحه‌بندی فقط روی id؛ نمایش هر تسک از کش fragment خوانده می‌شود
+        # و فقط miss ها (با کاربران مرتبط به صورت یکجا) سریال می‌شوند
+        tasks = filter_tasks(Task.objects.filter(team_id__in=team_ids), request).only('id', 'due_date', 'priority')
+        paginator = TaskPagination()
+        page = paginator.paginate_queryset(tasks, request, view=self)
+        data = get_task_fragments(task.id for task in page)
+        return with_etag(paginator.get_paginated_response(data), etag)
+
+class TaskSearchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        responses={200: TaskSerializer(many=True)},
+        summary="جستجوی متن کامل در تسک‌ها",
+        description=(
+            "جستجو در عنوان و توضیحات تسک‌های تیم‌های کاربر؛ نتایج به ترتیب ارتباط "
+            "(عنوان وزن بیشتری دارد) و به صورت صفحه‌بندی‌شده (cursor) برگردانده می‌شوند.\n"
+            "همه‌ی کلمات باید در تسک باشند و کلمه‌ی آخر به صورت پیشوندی جستجو می‌شود. "
+            "تفاوت‌های نوشتاری فارسی/عربی (ي/ی، ك/ک، نیم‌فاصله، اعراب و ارقام) نادیده گرفته می‌شوند."
+        ),
+        tags=['Tasks'],
+        parameters=[
+            OpenApiParameter('q', str, required=True, description="عبارت جستجو"),
+            OpenApiParameter('cursor', str, description="کرسر صفحه‌ی بعد"),
+            OpenApiParameter('page_size', int, description="اندازه‌ی صفحه (حداکثر ۱۰۰)"),
+        ],
+        examples=[
+            OpenApiExample(
+                "نمونه پاسخ جستجو",
+                value={
+                    "next": "http://localhost:8000/api/tasks/search/?q=%D9%84%D8%A7%DA%AF%DB%8C%D9%86&cursor=Wy0zLjIsNDFd",
+                    "results": [
+                        {
+                            "id": 1,
+                            "title": "رفع باگ لاگین",
+                            "description": "بررسی کن @mohammad",
+                            "due_date": "2025-11-05T09:00:00+03:30",
+                            "priority": "medium",
+                            "creator_info": {"id": 1, "username": "arash"},
+                            "assignee_info": {"id": 2, "username": "mohammad"},
+                            "tagged_users_info": [{"id": 2, "username": "mohammad"}],
+                            "team": 1
+                        }
+                    ]
+                },
+                response_only=True
+            )
+        ]
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"detail": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+        team_ids = sorted(get_user_team_ids(request.user.id))
+        paginator = SearchPagination()
+        page = paginator.paginate_search(get_search_backend(), query, team_ids, request)
+        data = get_task_fragments(task_id for task_id, _ in page)
+        return paginator.get_paginated_response(data)
+
+
+class TaskSyncView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(
+        summary="همگام‌سازی افزایشی تسک‌ها",
+        description=(
+            "به جای دریافت دوباره‌ی کل لیست، فقط تسک‌هایی که بعد از cursor ساخته یا ویرایش شده‌اند "
+            "(updated) و id تسک‌های حذف‌شده (deleted) برگردانده می‌شوند، همراه با cursor جدید.\n"
+            "اولین درخواست بدون cursor است و فقط cursor با reset=true برمی‌گرداند؛ بعد از آن لیست کامل "
+            "را یک بار بگیرید و از آن به بعد با cursor همگام شوید. اگر has_more=true بود بلافاصله با "
+            "cursor جدید دوباره درخواست دهید.\n"
+            "اگر عضویت تیم‌های کاربر عوض شده باشد یا cursor منقضی شده باشد، reset=true برمی‌گردد "
+            "و کلاینت باید لیست کامل را دوباره بگیرد.\n"
+            "تغییرات چند ثانیه بعد از ثبت در این endpoint دیده می‌شوند (TASK_SYNC_SETTLE_SECONDS)."
+        ),
+        tags=['Tasks'],
+        parameters=[
+            OpenApiParameter('cursor', str, description="cursor پاسخ قبلی"),
+            OpenApiParameter('page_size', int, description="حداکثر تعداد تغییرات در هر پاسخ (حداکثر ۵۰۰)"),
+        ],
+        responses={200: OpenApiResponse(description="تغییرات از cursor به بعد")},
+        examples=[
+            OpenApiExample(
+                "نمونه پاسخ sync",
+                value={
+                    "updated": [
+                        {
+                            "id": 1,
+                            "title": "رفع باگ لاگین",
+                            "description": "بررسی کن @mohammad",
+                            "due_date": "2025-11-05T09:00:00+03:30",
+                            "priority": "medium",
+                            "creator_info": {"id": 1, "username": "arash"},
+                            "assignee_info": {"id": 2, "username": "mohammad"},
+                            "tagged_users_info": [{"id": 2, "username": "mohammad"}],
+                            "team": 1
+                        }
+                    ],
+                    "deleted": [7],
+                    "has_more": False,
+                    "reset": False,
+                    "cursor": "eyJzZXEiOiA0MiwgInRlYW1zIjogIjNmYzQ3YjQxIiwgImF0IjogMTc2MDAwMDAwMH0"
+                },
+                response_only=True
+            )
+        ]
+    )
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('page_size', SYNC_PAGE_SIZE)), 1), SYNC_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = SYNC_PAGE_SIZE
+        team_ids = sorted(get_user_team_ids(request.user.id))
+        return Response(sync_tasks(team_ids, request.query_params.get('cursor'), limit))
+
 
 @extend_schema(
-    responses={200: TaskSerializer},
+    responses={200: TaskSerializer, 304: OpenApiResponse(description="تغییری نکرده است")},
     summary="نمایش جزئیات یک تسک",
-    description="فقط اعضای تیم می‌توانند جزئیات تسک را ببینند.",
+    description=(
+        "فقط اعضای تیم می‌توانند جزئیات تسک را ببینند.\n"
+        "پاسخ هدر ETag دارد و با If-None-Match می‌توان 304 گرفت."
+    ),
     tags=['Tasks'],
     examples=[
         OpenApiExample(
@@ -152,26 +432,29 @@ class TaskListView(APIView):
 )
 
 
-class TaskDetailView(APIView):
+class TaskDetailView(TaskObjectMixin, APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeamMember]
-
-
-    def get_object(self, pk):
-        try:
-            return Task.objects.get(pk=pk)
-        except Task.DoesNotExist:
-            return None
+    # برای بررسی دسترسی فقط team_id لازم است؛ بقیه فقط وقتی ETag عوض شده خوانده می‌شود
+    task_queryset = Task.objects.only('id', 'team_id')
 
     def get(self, request, pk):
-        task = self.get_object(pk)
+        task = self.get_task()
         if not task:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
         self.check_object_permissions(request, task)
-        serializer = TaskSerializer(task)
-        return Response(serializer.data)
+
+        versions = get_versions([task_version_key(task.pk)])
+        etag = make_etag(task.pk, versions)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        data = get_task_fragments([task.pk], versions)
+        if not data:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return with_etag(Response(data[0]), etag)
 
 
-class TaskAssignView(APIView):
+class TaskAssignView(TaskObjectMixin, APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeamMember]
 
 
@@ -198,9 +481,8 @@ class TaskAssignView(APIView):
         ]
     )
     def post(self, request, pk):
-        try:
-            task = Task.objects.get(pk=pk)
-        except Task.DoesNotExist:
+        task = self.get_task()
+        if not task:
             return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # بررسی اینکه درخواست‌دهنده عضو تیم است
@@ -216,22 +498,14 @@ class TaskAssignView(APIView):
             return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
         # بررسی اینکه assignee عضو همان تیم است
-        if assignee not in task.team.members.all():
+        if task.team_id not in get_user_team_ids(assignee.id):
             return Response({"detail": "User is not a member of this team."}, status=status.HTTP_403_FORBIDDEN)
 
         # تخصیص وظیفه
-        task.assignee = assignee
-        task.save()
-
-        # TODO: ارسال نوتیفیکیشن بلادرنگ
-        message = f"وظیفه '{task.title}' به شما واگذار شد."
-        send_realtime_notification(
-            user=assignee,
-            type_='assignment',
-            title='تخصیص وظیفه جدید',
-            message=message,
-            task=task
-        )
+        with transaction.atomic():
+            task.assignee = assignee
+            task.save()
+            send_realtime_notification(*assignment_notification(task, assignee))
 
         return Response({
             "message": "Task assigned successfully.",
@@ -240,7 +514,7 @@ class TaskAssignView(APIView):
         }, status=status.HTTP_200_OK)
     
 
-class TaskMentionView(APIView):
+class TaskMentionView(TaskObjectMixin, APIView):
     permission_classes = [permissions.IsAuthenticated, IsTeamMember]
 
     @extend_schema(
@@ -269,9 +543,8 @@ class TaskMentionView(APIView):
         ]
     )
     def post(self, request, pk):
-        try:
-            task = Task.objects.get(pk=pk)
-        except Task.DoesNotExist:
+        task = self.get_task()
+        if not task:
             return Response({"detail": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
 
         self.check_object_permissions(request, task)
@@ -281,35 +554,24 @@ class TaskMentionView(APIView):
         description = serializer.validated_data["description"]
 
         # پیدا کردن همه‌ی @usernameها
-        mentioned_usernames = re.findall(r'@(\w+)', description)
-        if not mentioned_usernames:
+        if not parse_mentions(description):
             return Response({"detail": "No usernames mentioned."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # پیدا کردن کاربران
-        users = User.objects.filter(username__in=mentioned_usernames)
-        team_members = task.team.members.all()
-
         # فقط اعضای تیم مجازند
-        valid_users = [u for u in users if u in team_members]
-
-        # افزودن به tagged_users
-        task.tagged_users.add(*valid_users)
-        task.description = description
-        task.save()
-
-        # TODO: ارسال نوتیفیکیشن بلادرنگ
-        for user in valid_users:
-            message = f"{request.user.username} شما را در وظیفه '{task.title}' تگ کرد."
-            send_realtime_notification(
-                user=user,
-                type_='mention',
-                title='تگ شدن در وظیفه',
-                message=message,
-                task=task
+        mentioned = resolve_mentions(task.team_id, description)
+
+        with transaction.atomic():
+            # افزودن به tagged_users
+            task.tagged_users.add(*[user_id for user_id, _ in mentioned])
+            task.description = description
+            task.save()
+
+            send_bulk_realtime_notifications(
+                mention_notifications(task, request.user, [user_id for user_id, _ in mentioned])
             )
 
         response_data = {
             "message": "Users tagged successfully.",
-            "tagged_users": [{"id": u.id, "username": u.username} for u in valid_users]
+            "tagged_users": [{"id": user_id, "username": username} for user_id, username in mentioned]
         }
         return Response(response_data, status=status.HTTP_200_OK)
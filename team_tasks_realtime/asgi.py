@@ -4,11 +4,11 @@ django_asgi_app = get_asgi_application()
 
 def get_application():   
     from channels.routing import ProtocolTypeRouter, URLRouter
-    from notifications.routing import get_websocket_urlpatterns
+    from notifications.routing import get_http_urlpatterns, get_websocket_urlpatterns
     websocket_urlpatterns = get_websocket_urlpatterns()
 
     return ProtocolTypeRouter({
-        "http": django_asgi_app,
+        "http": URLRouter(get_http_urlpatterns(django_asgi_app)),
         "websocket": TokenAuthMiddleware(
             URLRouter(websocket_urlpatterns)
         ),
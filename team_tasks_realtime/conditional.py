@@ -0,0 +1,78 @@
+"""
+GET شرطی (ETag / If-None-Match) بر اساس نسخه‌های نگهداری‌شده در کش.
+هر منبع (تیم، تسک، ...) یک کلید نسخه دارد که با تغییرش پس از commit حذف می‌شود؛
+خواندن بعدی یک نسخه‌ی تصادفی جدید می‌سازد و ETag عوض می‌شود.
+بنابراین بررسی ETag فقط یک get_many روی کش است و به دیتابیس نمی‌رود.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def get_versions(keys):
+    """نسخه‌ی فعلی هر کلید؛ کلیدهای ناموجود با یک نسخه‌ی جدید مقداردهی می‌شوند"""
+    keys = list(keys)
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(keys):
+    """نسخه‌ی async تابع get_versions"""
+    keys = list(keys)
+    versions = await cache.aget_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, VERSION_TIMEOUT)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(keys):
+    """
+    نسخه‌ها را پس از commit باطل می‌کند؛ اگر زودتر باطل شوند یک خواننده‌ی همزمان
+    ممکن است داده‌ی commit نشده‌ی قبلی را با نسخه‌ی تازه برچسب بزند.
+    """
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # مقایسه‌ی weak طبق RFC 9110 برای If-None-Match
+    return any(_opaque(candidate.strip()) == _opaque(etag) for candidate in header.split(','))
+
+
+def with_etag(response, etag):
+    response['ETag'] = etag
+    # پاسخ به کاربر وابسته است؛ کلاینت باید هر بار اعتبارسنجی کند
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag):
+    return with_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
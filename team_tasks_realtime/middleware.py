@@ -0,0 +1,127 @@
+import contextvars
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+request_latency = registry.histogram(
+    'http_request_duration_seconds', "HTTP request latency", ('endpoint', 'method')
+)
+request_queries = registry.histogram(
+    'http_request_sql_queries', "SQL queries per HTTP request", ('endpoint', 'method'), buckets=QUERY_BUCKETS
+)
+request_sql_time = registry.histogram(
+    'http_request_sql_duration_seconds', "SQL time per HTTP request", ('endpoint', 'method')
+)
+requests_total = registry.counter(
+    'http_requests_total', "HTTP responses by status", ('endpoint', 'method', 'status')
+)
+over_budget_total = registry.counter(
+    'http_requests_over_query_budget_total', "Requests exceeding METRICS_QUERY_BUDGET", ('endpoint', 'method')
+)
+
+
+class QueryStats:
+    """execute_wrapper که تعداد و زمان کوئری‌های یک درخواست را جمع می‌زند"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# آمار کوئری درخواست جاری؛ contextvar با sync_to_async به thread اجرای view و ORM هم می‌رسد
+_request_stats = contextvars.ContextVar('request_query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_recorder():
+    # connection ها مال thread اجرای ORM هستند؛ wrapper یک بار روی هر کدام نصب می‌شود
+    # و آمار را از contextvar درخواست جاری می‌خواند
+    for connection in connections.all():
+        if record_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    latency، تعداد و زمان SQL هر endpoint را به صورت histogram ثبت می‌کند
+    و درخواست‌هایی را که از METRICS_QUERY_BUDGET بیشتر کوئری بزنند علامت می‌زند.
+    فقط با METRICS_ENABLED = True فعال می‌شود.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.query_budget = getattr(settings, 'METRICS_QUERY_BUDGET', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            install_query_recorder()
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            # در ASGI، view های sync و ORM async در thread مشترک ThreadSensitiveContext درخواست اجرا می‌شوند
+            await sync_to_async(install_query_recorder, thread_sensitive=True)()
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        match = request.resolver_match
+        endpoint = match.route if match else 'unmatched'
+        method = request.method
+        request_latency.observe(elapsed, endpoint=endpoint, method=method)
+        request_queries.observe(stats.count, endpoint=endpoint, method=method)
+        request_sql_time.observe(stats.duration, endpoint=endpoint, method=method)
+        requests_total.inc(endpoint=endpoint, method=method, status=response.status_code)
+
+        if self.query_budget is not None and stats.count > self.query_budget:
+            over_budget_total.inc(endpoint=endpoint, method=method)
+            logger.warning(
+                "%s %s ran %d SQL queries (budget %d, %.1f ms SQL)",
+                method, request.path, stats.count, self.query_budget, stats.duration * 1000
+            )
@@ -0,0 +1,9 @@
+"""
+تنظیمات مشترک تست‌ها: کش و channel layer داخل پروسس تا تست‌ها به Redis نیاز نداشته باشند.
+کلاس‌های تست با @override_settings(**LOCAL_SETTINGS) از آن استفاده می‌کنند.
+"""
+
+LOCAL_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+}
@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.test import AsyncClient, Client, SimpleTestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from teams.models import Team
+from .metrics import registry
+from .middleware import request_queries
+from .testing import LOCAL_SETTINGS
+
+
+def sql_queries_sum(endpoint):
+    prefix = f'http_request_sql_queries_sum{{endpoint="{endpoint}",method="GET"}} '
+    for line in registry.render().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0
+
+
+@override_settings(METRICS_ENABLED=True, **LOCAL_SETTINGS)
+class RequestMetricsMiddlewareTests(TransactionTestCase):
+
+    def setUp(self):
+        request_queries.clear()
+        self.user = User.objects.create(username='arash')
+        Team.objects.create(name='team').members.add(self.user)
+        self.token = Token.objects.create(user=self.user).key
+
+    def tearDown(self):
+        request_queries.clear()
+
+    def test_counts_queries_under_wsgi(self):
+        Client(headers={'Authorization': f'Token {self.token}'}).get('/api/notifications/')
+        self.assertGreater(sql_queries_sum('api/notifications/'), 0)
+
+    async def test_counts_queries_run_in_sync_to_async_threads(self):
+        # ASGIHandler هر درخواست را در ThreadSensitiveContext اجرا می‌کند؛ ORM در thread دیگری connection خودش را دارد
+        client = AsyncClient()
+        for path in ('/api/notifications/', '/api/tasks/async/'):
+            response = await client.get(path, headers={'Authorization': f'Token {self.token}'})
+            self.assertEqual(response.status_code, 200)
+        self.assertGreater(sql_queries_sum('api/notifications/'), 0)
+        self.assertGreater(sql_queries_sum('api/tasks/async/'), 0)
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-secret', METRICS_ALLOWED_IPS=['10.0.0.5'])
+class MetricsAccessTests(SimpleTestCase):
+
+    def test_requires_token_or_allowed_ip(self):
+        client = Client()
+        self.assertEqual(client.get('/metrics/').status_code, 403)
+        self.assertEqual(client.get('/metrics/', headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        self.assertEqual(client.get('/metrics/', headers={'Authorization': 'Bearer scrape-secret'}).status_code, 200)
+        self.assertEqual(client.get('/metrics/', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=[])
+    def test_closed_when_nothing_is_configured(self):
+        self.assertEqual(Client().get('/metrics/', headers={'Authorization': 'Bearer '}).status_code, 403)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(Client().get('/metrics/', headers={'Authorization': 'Bearer scrape-secret'}).status_code, 404)
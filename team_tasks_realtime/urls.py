@@ -17,12 +17,17 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularRedocView, SpectacularAPIView, SpectacularSwaggerView
+from .views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('auth_api.urls')),
     path('api/teams/', include('teams.urls')),
     path('api/tasks/', include('tasks.urls')),
+    path('api/notifications/', include('notifications.urls')),
+
+    # متریک‌های Prometheus (با METRICS_ENABLED)
+    path('metrics/', metrics_view, name='metrics'),
 
     # OpenAPI schema (JSON)
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
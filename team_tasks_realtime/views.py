@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from .metrics import CONTENT_TYPE, metrics_access_allowed, registry
+
+
+def metrics_view(request):
+    """متریک‌های این پروسس در قالب متنی Prometheus (فقط برای METRICS_TOKEN یا METRICS_ALLOWED_IPS)"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404
+    if not metrics_access_allowed(request.META.get('REMOTE_ADDR'), request.headers.get('Authorization')):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
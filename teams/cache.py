@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Team
+
+
+TEAM_CACHE_TIMEOUT = 60 * 60
+
+
+def user_team_ids_key(user_id):
+    return f"user:{user_id}:team_ids"
+
+
+def get_user_team_ids(user_id):
+    """
+    مجموعه‌ی id تیم‌هایی که کاربر عضو آن‌هاست (برای بررسی دسترسی).
+    با تغییر عضویت (signals.py) باطل می‌شود.
+    """
+    key = user_team_ids_key(user_id)
+    team_ids = cache.get(key)
+    if team_ids is None:
+        team_ids = frozenset(Team.members.through.objects.filter(user_id=user_id).values_list('team_id', flat=True))
+        cache.set(key, team_ids, TEAM_CACHE_TIMEOUT)
+    return team_ids
+
+
+async def aget_user_team_ids(user_id):
+    """نسخه‌ی async تابع get_user_team_ids"""
+    key = user_team_ids_key(user_id)
+    team_ids = await cache.aget(key)
+    if team_ids is None:
+        team_ids = frozenset([
+            team_id async for team_id in
+            Team.members.through.objects.filter(user_id=user_id).values_list('team_id', flat=True)
+        ])
+        await cache.aset(key, team_ids, TEAM_CACHE_TIMEOUT)
+    return team_ids
+
+
+def _delete_on_commit(keys):
+    # مثل bump_versions: اگر قبل از commit پاک شود، خواننده‌ی همزمان عضویت قبلی را
+    # دوباره برای TEAM_CACHE_TIMEOUT در کش می‌گذارد
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_user_team_ids(user_ids):
+    _delete_on_commit(user_team_ids_key(user_id) for user_id in user_ids)
+
+
+def team_member_index_key(team_id):
+    return f"team:{team_id}:member_index"
+
+
+def get_team_member_index(team_id):
+    """
+    نگاشت username -> id اعضای تیم.
+    از کش خوانده می‌شود و فقط در صورت نبودن در کش یک کوئری اجرا می‌شود.
+    با تغییر اعضای تیم (signals.py) باطل می‌شود.
+    """
+    key = team_member_index_key(team_id)
+    index = cache.get(key)
+    if index is None:
+        index = dict(User.objects.filter(teams=team_id).values_list('username', 'id'))
+        cache.set(key, index, TEAM_CACHE_TIMEOUT)
+    return index
+
+
+async def aget_team_member_index(team_id):
+    """نسخه‌ی async تابع get_team_member_index"""
+    key = team_member_index_key(team_id)
+    index = await cache.aget(key)
+    if index is None:
+        index = {
+            username: user_id async for username, user_id in
+            User.objects.filter(teams=team_id).values_list('username', 'id')
+        }
+        await cache.aset(key, index, TEAM_CACHE_TIMEOUT)
+    return index
+
+
+def invalidate_team_member_index(team_ids):
+    _delete_on_commit(team_member_index_key(team_id) for team_id in team_ids)
+
+
+def team_version_key(team_id):
+    # نسخه‌ی نمایش تیم (نام و اعضا) برای ETag لیست تیم‌ها
+    return f"team:{team_id}:version"
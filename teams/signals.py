@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from team_tasks_realtime.conditional import bump_versions
+from .cache import invalidate_team_member_index, invalidate_user_team_ids, team_version_key
+from .models import Team
+
+
+# بعد از commit هر تغییر عضویت (و باطل شدن کش‌ها) ارسال می‌شود: team_ids و user_ids تحت تأثیر
+membership_changed = Signal()
+
+
+def send_membership_changed(team_ids, user_ids):
+    # کش‌ها هم در on_commit باطل می‌شوند و به ترتیب ثبت، قبل از این ارسال اجرا شده‌اند
+    transaction.on_commit(
+        lambda: membership_changed.send(sender=Team, team_ids=team_ids, user_ids=user_ids), robust=True
+    )
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def team_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # بعد از clear دیگر نمی‌دانیم کدام ردیف‌ها حذف شده‌اند
+        related = instance.teams if reverse else instance.members
+        instance._cleared_pks = set(related.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        # user.teams.add/remove/clear
+        team_ids, user_ids = set(pk_set), {instance.pk}
+    else:
+        # team.members.add/remove/clear
+        team_ids, user_ids = {instance.pk}, set(pk_set)
+    invalidate_team_member_index(team_ids)
+    invalidate_user_team_ids(user_ids)
+    bump_versions([team_version_key(team_id) for team_id in team_ids])
+    send_membership_changed(team_ids, user_ids)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    # save های last_login و password (با update_fields یا بدون تغییر username) کش‌ها را باطل نمی‌کنند
+    instance._username_changed = False
+    if instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    instance._username_changed = previous is not None and previous != instance.username
+
+
+def username_changed(instance):
+    """در post_save کاربر: username نسبت به دیتابیس قبل از save عوض شده است"""
+    return getattr(instance, '_username_changed', False)
+
+
+@receiver(post_save, sender=User)
+@receiver(pre_delete, sender=User)
+def user_changed(sender, instance, signal, **kwargs):
+    # تغییر username یا حذف کاربر روی ایندکس تیم‌هایش اثر می‌گذارد
+    if signal is post_save and not username_changed(instance):
+        return
+    team_ids = list(instance.teams.values_list('id', flat=True))
+    invalidate_team_member_index(team_ids)
+    invalidate_user_team_ids([instance.pk])
+    bump_versions([team_version_key(team_id) for team_id in team_ids])
+
+
+@receiver(post_save, sender=Team)
+def team_saved(sender, instance, created, **kwargs):
+    if not created:
+        bump_versions([team_version_key(instance.pk)])
+
+
+@receiver(pre_delete, sender=Team)
+def team_deleting(sender, instance, **kwargs):
+    # حذف تیم ردیف‌های عضویت را بدون m2m_changed پاک می‌کند
+    instance._member_ids = list(instance.members.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Team)
+def team_deleted(sender, instance, **kwargs):
+    member_ids = set(getattr(instance, '_member_ids', []))
+    invalidate_team_member_index([instance.pk])
+    invalidate_user_team_ids(member_ids)
+    bump_versions([team_version_key(instance.pk)])
+    send_membership_changed({instance.pk}, member_ids)
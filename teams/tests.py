@@ -1,3 +1,89 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from team_tasks_realtime.testing import LOCAL_SETTINGS
+from .cache import get_team_member_index, get_user_team_ids
+from .models import Team
+from .signals import membership_changed
+
+
+@override_settings(**LOCAL_SETTINGS)
+class MembershipCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+
+    def test_caches_invalidated_and_signal_sent_after_commit(self):
+        self.assertEqual(get_user_team_ids(self.user.pk), frozenset())
+        self.assertEqual(get_team_member_index(self.team.pk), {})
+        received = []
+
+        def receiver(sender, team_ids, user_ids, **kwargs):
+            received.append((team_ids, user_ids))
+
+        membership_changed.connect(receiver)
+        self.addCleanup(membership_changed.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.add(self.user)
+            # تا commit نشده، خواننده‌ی همزمان نباید عضویت قبلی را دوباره در کش بگذارد
+            self.assertEqual(received, [])
+            self.assertIsNotNone(cache.get(f'user:{self.user.pk}:team_ids'))
+
+        self.assertEqual(received, [({self.team.pk}, {self.user.pk})])
+        self.assertEqual(get_user_team_ids(self.user.pk), frozenset({self.team.pk}))
+        self.assertEqual(get_team_member_index(self.team.pk), {'arash': self.user.pk})
+
+
+@override_settings(**LOCAL_SETTINGS)
+class UserChangedTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='arash')
+        Team.objects.create(name='team').members.add(self.user)
+
+    def save_and_track(self, save):
+        with mock.patch('teams.signals.invalidate_user_team_ids') as teams_invalidate, \
+                mock.patch('tasks.signals.track_task_changes') as task_changes:
+            save()
+        return teams_invalidate.called, task_changes.called
+
+    def test_login_and_password_saves_are_ignored(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('secret')
+        self.assertEqual(self.save_and_track(user.save), (False, False))
+        self.assertEqual(self.save_and_track(lambda: user.save(update_fields=['last_login'])), (False, False))
+
+    def test_username_change_invalidates(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'sara'
+        self.assertEqual(self.save_and_track(user.save), (True, True))
+
+
+@override_settings(**LOCAL_SETTINGS)
+class TeamListConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='arash')
+        self.team = Team.objects.create(name='team')
+        self.team.members.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_not_modified_until_membership_changes(self):
+        response = self.client.get('/api/teams/')
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertEqual(self.client.get('/api/teams/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team.members.add(User.objects.create(username='sara'))
+        response = self.client.get('/api/teams/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -1,7 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from drf_spectacular.utils import extend_schema, OpenApiExample
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
+from team_tasks_realtime.conditional import etag_matches, get_versions, make_etag, not_modified, with_etag
+from .cache import get_user_team_ids, team_version_key
 from .serializers import TeamSerializer
 from .models import Team
 
@@ -46,11 +48,12 @@ class TeamCreateView(APIView):
 
 
 @extend_schema(
-    responses={200: TeamSerializer(many=True)},
+    responses={200: TeamSerializer(many=True), 304: OpenApiResponse(description="تغییری نکرده است")},
     summary="لیست تیم‌های کاربر",
     description=(
         "تمام تیم‌هایی که کاربر فعلی عضو آن‌هاست نمایش داده می‌شوند.\n"
-        "هر تیم شامل شناسه (ID)، نام تیم، و اطلاعات اعضا است."
+        "هر تیم شامل شناسه (ID)، نام تیم، و اطلاعات اعضا است.\n"
+        "پاسخ هدر ETag دارد و با If-None-Match می‌توان 304 گرفت."
     ),
     tags=['Teams'],
     examples=[
@@ -84,7 +87,13 @@ class TeamListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        # ETag از کش ساخته می‌شود: تیم‌های کاربر و نسخه‌ی هر تیم
+        team_ids = sorted(get_user_team_ids(request.user.id))
+        etag = make_etag(team_ids, get_versions(team_version_key(team_id) for team_id in team_ids))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         # فقط تیم‌هایی که کاربر عضو آن‌هاست
         teams = Team.objects.filter(members=request.user)
         serializer = TeamSerializer(teams, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return with_etag(Response(serializer.data), etag)
\ No newline at end of file